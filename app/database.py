@@ -1,8 +1,13 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+import asyncio
 import os
+import random
 
 load_dotenv()
 
@@ -14,12 +19,35 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+def _async_database_url(url: str):
+    # asyncpg no entiende `sslmode`; su equivalente es `ssl`
+    async_url = make_url(url).set(drivername="postgresql+asyncpg")
+    sslmode = async_url.query.get("sslmode")
+    if sslmode:
+        async_url = async_url.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    return async_url
+
+ASYNC_DATABASE_URL = _async_database_url(DATABASE_URL)
+
+# Motor asíncrono: el que usan los routers, sin bloquear el event loop
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=300,
+    pool_size=7,
+    max_overflow=0,
+    echo=False
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# Motor síncrono: solo para scripts y tareas de mantenimiento fuera del servidor
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
     pool_recycle=300,
-    pool_size= 7, 
-    max_overflow=0,  
+    pool_size=2,
+    max_overflow=0,
     echo=False
 )
 
@@ -27,9 +55,29 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# Errores de Postgres que se resuelven reintentando la transacción completa
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+async def run_with_retry(db: AsyncSession, operation, retries: int = 3):
+    """Ejecuta `await operation()` reintentando ante serialization failure o deadlock.
+    Cualquier otro error hace rollback y se propaga.
+
+    `operation` debe terminar en su `db.commit()`: lo que venga después (refresh, bump,
+    auditoría) va fuera, porque un error posterior al commit no se puede deshacer y el
+    reintento repetiría la escritura."""
+    for attempt in range(1, retries + 1):
+        try:
+            return await operation()
+        except DBAPIError as e:
+            await db.rollback()
+            sqlstate = getattr(e.orig, "pgcode", None) or getattr(e.orig, "sqlstate", None)
+            if sqlstate not in RETRYABLE_SQLSTATES or attempt == retries:
+                raise
+            await asyncio.sleep(random.uniform(0.01, 0.05) * attempt)
+        except Exception:
+            await db.rollback()
+            raise
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, BigInteger, Text, Boolean, DateTime, ForeignKey, Integer, JSON, UniqueConstraint, Date
+from sqlalchemy import Column, BigInteger, Text, Boolean, DateTime, ForeignKey, Integer, JSON, UniqueConstraint, Date, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -11,9 +11,17 @@ class ProposalsTurn(Base):
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     status = Column(Boolean, nullable=False, default=True)
 
+# Número de ciclo de propuestas asignado a cada mes (app.utils.cycles)
+class ProposalCycle(Base):
+    __tablename__ = 'proposal_cycles'
+    __table_args__ = {'schema': 'public'}
+    month_year = Column(Integer, primary_key=True, autoincrement=False)
+    proposal_number = Column(Integer, nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
 class SteamUser(Base):
     __tablename__ = 'steamuser'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (Index('ix_steamuser_auth_uid', 'auth_uid'), {'schema': 'public'})
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     name = Column(Text, nullable=False)
     created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
@@ -33,7 +41,7 @@ class SteamUser(Base):
 
 class MonthlyCollection(Base):
     __tablename__ = 'monthly_collections'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (Index('uq_monthly_collections_due_date', 'due_date', unique=True), {'schema': 'public'})
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     due_date = Column(Date, nullable=False)
     amount_per_member = Column(Integer, nullable=False, default=10000)
@@ -55,7 +63,11 @@ class MonthlyCollectionItem(Base):
 
 class Deposit(Base):
     __tablename__ = 'deposits'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_deposits_member_id_date', 'member_id', 'date', 'id'),
+        Index('ix_deposits_date_id', 'date', 'id'),
+        {'schema': 'public'}
+    )
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     member_id = Column(BigInteger, ForeignKey('public.steamuser.id', ondelete='CASCADE'), nullable=False)
     amount = Column(Integer, nullable=False)
@@ -66,7 +78,13 @@ class Deposit(Base):
 
 class GameProposal(Base):
     __tablename__ = 'game_proposals'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_game_proposals_proposed', 'id', postgresql_where=text("status = 'proposed'")),
+        Index('ix_game_proposals_active_proposer', 'proposer_id', postgresql_where=text("status IN ('proposed', 'voted')")),
+        Index('ix_game_proposals_month_year', 'month_year', 'proposal_number'),
+        Index('ix_game_proposals_proposed_at_id', 'proposed_at', 'id'),
+        {'schema': 'public'}
+    )
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     title = Column(Text, nullable=False)
     proposer_id = Column(BigInteger, ForeignKey('public.steamuser.id'), nullable=False)
@@ -75,24 +93,34 @@ class GameProposal(Base):
     status = Column(Text, nullable=False, default='proposed')
     proposal_number = Column(Integer, nullable=True)
     month_year = Column(Integer, nullable=True)
+    # Contador desnormalizado de votos, mantenido por app.utils.votes
+    votes_count = Column(Integer, nullable=False, default=0, server_default='0')
     proposer = relationship('SteamUser', back_populates='proposals')
     votes = relationship('Vote', back_populates='proposal', cascade='all, delete-orphan')
     purchases = relationship('Purchase', back_populates='proposal')
 
 class Vote(Base):
     __tablename__ = 'votes'
-    __table_args__ = (UniqueConstraint('proposal_id', 'member_id', name='votes_proposal_id_member_id_key'), {'schema': 'public'})
+    # El índice de la restricción única ya cubre las búsquedas por proposal_id
+    __table_args__ = (
+        UniqueConstraint('proposal_id', 'member_id', name='votes_proposal_id_member_id_key'),
+        Index('ix_votes_member_id', 'member_id'),
+        # Un solo voto activo (ronda en curso) por miembro
+        Index('uq_votes_active_member', 'member_id', unique=True, postgresql_where=text('active')),
+        {'schema': 'public'}
+    )
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     proposal_id = Column(BigInteger, ForeignKey('public.game_proposals.id', ondelete='CASCADE'), nullable=False)
     member_id = Column(BigInteger, ForeignKey('public.steamuser.id'), nullable=False)
     vote = Column(Boolean, nullable=False)
+    active = Column(Boolean, nullable=False, default=True, server_default=text('true'))
     voted_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     proposal = relationship('GameProposal', back_populates='votes')
     member = relationship('SteamUser', back_populates='votes')
 
 class Purchase(Base):
     __tablename__ = 'purchases'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (Index('ix_purchases_purchased_at_id', 'purchased_at', 'id'), {'schema': 'public'})
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     proposal_id = Column(BigInteger, ForeignKey('public.game_proposals.id'), nullable=True)
     title = Column(Text, nullable=False)
@@ -109,7 +137,11 @@ class Purchase(Base):
 
 class PurchaseShare(Base):
     __tablename__ = 'purchase_shares'
-    __table_args__ = (UniqueConstraint('purchase_id', 'member_id', name='purchase_shares_purchase_id_member_id_key'), {'schema': 'public'})
+    __table_args__ = (
+        UniqueConstraint('purchase_id', 'member_id', name='purchase_shares_purchase_id_member_id_key'),
+        Index('ix_purchase_shares_member_id_paid', 'member_id', 'paid', postgresql_include=['share_amount', 'purchase_id']),
+        {'schema': 'public'}
+    )
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     purchase_id = Column(BigInteger, ForeignKey('public.purchases.id', ondelete='CASCADE'), nullable=False)
     member_id = Column(BigInteger, ForeignKey('public.steamuser.id'), nullable=False)
@@ -122,7 +154,11 @@ class PurchaseShare(Base):
 
 class Adjustment(Base):
     __tablename__ = 'adjustments'
-    __table_args__ = {'schema': 'public'}
+    __table_args__ = (
+        Index('ix_adjustments_member_id_created_at', 'member_id', 'created_at', 'id'),
+        Index('ix_adjustments_created_at_id', 'created_at', 'id'),
+        {'schema': 'public'}
+    )
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     member_id = Column(BigInteger, ForeignKey('public.steamuser.id', ondelete='CASCADE'), nullable=False)
     amount = Column(Integer, nullable=False)
@@ -137,6 +173,7 @@ class Balance(Base):
     member_id = Column(BigInteger, ForeignKey('public.steamuser.id', ondelete='CASCADE'), nullable=False, unique=True)
     total_deposits = Column(Integer, nullable=False, default=0)
     total_expenses = Column(Integer, nullable=False, default=0)
+    total_adjustments = Column(Integer, nullable=False, default=0, server_default='0')
     current_balance = Column(Integer, nullable=False, default=0)
     last_updated = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     member = relationship('SteamUser', backref='balance')
@@ -2,10 +2,18 @@ from .auth_router import router as auth_router
 from .deposits_router import router as deposits_router
 from .proposals_router import router as proposals_router
 from .purchases_router import router as purchases_router
+from .export_router import router as export_router
+from .collections_router import router as collections_router
+from .adjustments_router import router as adjustments_router
+from .settings_router import router as settings_router
 
 __all__ = [
     "auth_router",
     "deposits_router",
     "proposals_router",
-    "purchases_router"
+    "purchases_router",
+    "export_router",
+    "collections_router",
+    "adjustments_router",
+    "settings_router"
 ]
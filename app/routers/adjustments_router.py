@@ -0,0 +1,152 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert, select
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from app.database import get_db
+from app.models import SteamUser
+from app.models.models import Adjustment
+from app.utils.audit import audit_log
+from app.utils.auth import CurrentUser, get_current_active_user, require_master_role
+from app.utils.balances import apply_balance_deltas
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
+from app.utils.responses import model_response
+from app.utils.versions import bump, conditional
+from app.schemas import schemas
+
+router = APIRouter(prefix="/adjustments", tags=["Adjustments"])
+
+ADJUSTMENT_PAGE = TypeAdapter(schemas.Page[schemas.Adjustment])
+
+MAX_BULK_ADJUSTMENTS = 1000
+
+
+async def insert_adjustments(db: AsyncSession, adjustments: List[schemas.AdjustmentCreate]) -> List[dict]:
+    """Inserta los ajustes y los suma a `balance` en la transacción actual (sin commit)."""
+    now = datetime.utcnow()
+    table = Adjustment.__table__
+    result = await db.execute(
+        insert(table).returning(*table.c, sort_by_parameter_order=True),
+        [{
+            "member_id": adjustment.member_id,
+            "amount": int(adjustment.amount),
+            "reason": adjustment.reason,
+            "created_at": now
+        } for adjustment in adjustments]
+    )
+    inserted = [dict(row) for row in result.mappings()]
+
+    totals: Dict[int, int] = {}
+    for row in inserted:
+        totals[row["member_id"]] = totals.get(row["member_id"], 0) + row["amount"]
+    await apply_balance_deltas(db, adjustments=totals)
+    return inserted
+
+
+def check_amounts(adjustments: List[schemas.AdjustmentCreate]) -> List[dict]:
+    return [
+        {"row": number, "error": "El monto del ajuste debe ser un entero distinto de 0"}
+        for number, adjustment in enumerate(adjustments, start=1)
+        if int(adjustment.amount) == 0 or adjustment.amount != int(adjustment.amount)
+    ]
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_adjustment(
+    adjustment_data: schemas.AdjustmentCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Corrige el saldo de un miembro: monto positivo suma, negativo resta."""
+    if check_amounts([adjustment_data]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="El monto del ajuste debe ser un entero distinto de 0"
+        )
+
+    member = await db.get(SteamUser, adjustment_data.member_id)
+    if not member:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario con ID {adjustment_data.member_id} no encontrado"
+        )
+
+    adjustment, = await insert_adjustments(db, [adjustment_data])
+    await db.commit()
+    bump("adjustments", "balances")
+    audit_log.record("adjustment.create", current_user.id, {
+        "adjustment_id": adjustment["id"], "member_id": adjustment["member_id"], "amount": adjustment["amount"]
+    })
+
+    return {
+        "message": "Ajuste registrado exitosamente",
+        "adjustment": {**adjustment, "member_name": member.name}
+    }
+
+
+@router.post("/bulk", status_code=status.HTTP_201_CREATED)
+async def create_adjustments_bulk(
+    adjustments: List[schemas.AdjustmentCreate],
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Registra varios ajustes en una transacción. Todo o nada, con errores por fila."""
+    if not adjustments:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No hay ajustes para registrar")
+    if len(adjustments) > MAX_BULK_ADJUSTMENTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {MAX_BULK_ADJUSTMENTS} ajustes por solicitud"
+        )
+
+    member_ids = {adjustment.member_id for adjustment in adjustments}
+    members = dict((await db.execute(
+        select(SteamUser.id, SteamUser.name).where(SteamUser.id.in_(member_ids))
+    )).all())
+    errors = check_amounts(adjustments) + [
+        {"row": number, "error": f"Usuario con ID {adjustment.member_id} no encontrado"}
+        for number, adjustment in enumerate(adjustments, start=1)
+        if adjustment.member_id not in members
+    ]
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "No se registró ningún ajuste", "errors": sorted(errors, key=lambda error: error["row"])}
+        )
+
+    inserted = await insert_adjustments(db, adjustments)
+    await db.commit()
+    bump("adjustments", "balances")
+    audit_log.record("adjustment.bulk", current_user.id, {
+        "created": len(inserted), "total_amount": sum(row["amount"] for row in inserted),
+        "adjustment_ids": [row["id"] for row in inserted]
+    })
+
+    return {
+        "message": f"{len(inserted)} ajustes registrados exitosamente",
+        "created": len(inserted),
+        "total_amount": sum(row["amount"] for row in inserted),
+        "results": [
+            {"row": number, "member_name": members[row["member_id"]], **row}
+            for number, row in enumerate(inserted, start=1)
+        ]
+    }
+
+
+@router.get("/", response_model=schemas.Page[schemas.Adjustment])
+async def get_adjustments(
+    response: Response,
+    member_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("adjustments"))
+):
+    stmt = select(Adjustment.__table__)
+    if member_id is not None:
+        stmt = stmt.where(Adjustment.member_id == member_id)
+    page = await fetch_page(db, stmt, Adjustment.created_at, Adjustment.id, cursor, limit, mappings=True)
+    return model_response(ADJUSTMENT_PAGE, page, response)
@@ -1,16 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, UploadFile, File
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
 from typing import Dict, Any
 from datetime import datetime
 import uuid
 import os
 from pathlib import Path
-from PIL import Image
-import io
 
 from app.database import get_db
-from app.models import SteamUser, AuditLog
+from app.models import SteamUser, Balance
 from app.schemas import schemas
 from app.schemas import auth_schemas
 from app.utils.auth import (
@@ -23,18 +21,26 @@ from app.utils.auth import (
     clear_auth_cookies,
     get_current_user,
     get_current_active_user,
+    get_supabase,
+    invalidate_user_cache,
+    CurrentUser,
     REFRESH_COOKIE_NAME
 )
+from app.utils.audit import audit_log
+from app.utils.balances import balance_columns
+from app.utils.external import run_external
+from app.utils.responses import json_response
+from app.utils.versions import bump, conditional
 from app.utils.cloudinary_config import upload_profile_image as cloudinary_upload, delete_profile_image as cloudinary_delete
 
 router = APIRouter(prefix="/auth", tags=["Autenticación"])
 
-from app.utils.auth import supabase
-
 @router.post("/password-reset-request", response_model=dict)
 async def password_reset_request(data: auth_schemas.PasswordReset):
     """Solicita el envío de un email de reseteo de contraseña usando Supabase."""
-    response = supabase.auth.reset_password_email(data.email)
+    response = await run_external(
+        "supabase.reset_password_email", lambda: get_supabase().auth.reset_password_email(data.email)
+    )
     if response is None:
         return {"message": "Correo de reseteo enviado. Revisa tu bandeja de entrada."}
     if response.get('error'):
@@ -46,10 +52,10 @@ async def password_reset_request(data: auth_schemas.PasswordReset):
 async def register(
     user_data: auth_schemas.UserRegister,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    existing_user = db.query(SteamUser).filter(SteamUser.name == user_data.name).first()
+    existing_user = await db.scalar(select(SteamUser).where(SteamUser.name == user_data.name))
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -57,7 +63,7 @@ async def register(
         )
     
 
-    supabase_user = register_user_supabase(
+    supabase_user = await register_user_supabase(
         email=user_data.email,
         password=user_data.password,
         name=user_data.name
@@ -72,8 +78,10 @@ async def register(
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    bump("users")
+    await db.refresh(new_user)
+    audit_log.record("user.register", new_user.id, {"name": new_user.name, "role": new_user.role})
     
 
     access_token = create_access_token(data={"sub": str(new_user.auth_uid)})
@@ -100,18 +108,18 @@ async def register(
 async def login(
     credentials: auth_schemas.UserLogin,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
-    supabase_response = login_user_supabase(
+    supabase_response = await login_user_supabase(
         email=credentials.email,
         password=credentials.password
     )
     
 
-    user = db.query(SteamUser).filter(
+    user = await db.scalar(select(SteamUser).where(
         SteamUser.auth_uid == supabase_response["auth_uid"]
-    ).first()
+    ))
     
     if not user:
         raise HTTPException(
@@ -149,8 +157,8 @@ async def login(
 @router.post("/logout")
 async def logout(
     response: Response,
-    current_user: SteamUser = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
 
     clear_auth_cookies(response)
@@ -163,7 +171,7 @@ async def logout(
 async def refresh_token(
     request: Request,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
 
     refresh_token = request.cookies.get(REFRESH_COOKIE_NAME)
@@ -186,7 +194,7 @@ async def refresh_token(
     auth_uid = payload.get("sub")
     
 
-    user = db.query(SteamUser).filter(SteamUser.auth_uid == auth_uid).first()
+    user = await db.scalar(select(SteamUser).where(SteamUser.auth_uid == auth_uid))
     if not user or not user.active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -203,11 +211,11 @@ async def refresh_token(
     return {"message": "Tokens refrescados exitosamente"}
 
 @router.get("/me", response_model=schemas.SteamUser)
-async def get_me(current_user: SteamUser = Depends(get_current_active_user)):
+async def get_me(current_user: CurrentUser = Depends(get_current_active_user)):
     return current_user
 
 @router.get("/verify")
-async def verify_auth(current_user: SteamUser = Depends(get_current_active_user)):
+async def verify_auth(current_user: CurrentUser = Depends(get_current_active_user)):
     return {
         "authenticated": True,
         "user": {
@@ -220,8 +228,8 @@ async def verify_auth(current_user: SteamUser = Depends(get_current_active_user)
 @router.post("/upload-profile-image", response_model=dict)
 async def upload_profile_image_endpoint(
     file: UploadFile = File(...),
-    current_user: SteamUser = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
     allowed_content_types = ["image/jpeg", "image/jpg", "image/png", "image/webp", "image/gif"]
     if file.content_type not in allowed_content_types:
@@ -240,13 +248,14 @@ async def upload_profile_image_endpoint(
         )
     
     try:
+        user = await db.get(SteamUser, current_user.id)
         old_public_id = None
-        if current_user.profile_image and "cloudinary.com" in current_user.profile_image:
-            parts = current_user.profile_image.split("/")
-            if "steam_group/profiles" in current_user.profile_image:
+        if user.profile_image and "cloudinary.com" in user.profile_image:
+            parts = user.profile_image.split("/")
+            if "steam_group/profiles" in user.profile_image:
                 old_public_id = f"steam_group/profiles/{parts[-1].split('.')[0]}"
 
-        result = cloudinary_upload(contents, current_user.id, file.filename)
+        result = await run_external("cloudinary.upload", cloudinary_upload, contents, current_user.id, file.filename)
 
         # Check if upload actually succeeded and URL is present
         if not result or not result.get("url"):
@@ -257,14 +266,18 @@ async def upload_profile_image_endpoint(
 
         if old_public_id:
             try:
-                cloudinary_delete(old_public_id)
+                await run_external("cloudinary.destroy", cloudinary_delete, old_public_id)
             except Exception:
                 pass
 
-        current_user.profile_image = result["url"]
-        current_user.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(current_user)
+        user.profile_image = result["url"]
+        user.updated_at = datetime.utcnow()
+        await db.commit()
+        invalidate_user_cache(user.auth_uid)
+        bump("users")
+        audit_log.record("profile_image.upload", current_user.id, {
+            "url": result["url"], "replaced": old_public_id is not None
+        })
 
         return {
             "message": "Imagen de perfil actualizada exitosamente",
@@ -285,27 +298,31 @@ async def upload_profile_image_endpoint(
 
 @router.delete("/profile-image", response_model=dict)
 async def delete_profile_image_endpoint(
-    current_user: SteamUser = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
 ):
-    if not current_user.profile_image:
+    user = await db.get(SteamUser, current_user.id)
+    if not user.profile_image:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No tienes una imagen de perfil configurada"
         )
     
-    if "cloudinary.com" in current_user.profile_image:
-        parts = current_user.profile_image.split("/")
-        if "steam_group/profiles" in current_user.profile_image:
+    if "cloudinary.com" in user.profile_image:
+        parts = user.profile_image.split("/")
+        if "steam_group/profiles" in user.profile_image:
             public_id = f"steam_group/profiles/{parts[-1].split('.')[0]}"
             try:
-                cloudinary_delete(public_id)
+                await run_external("cloudinary.destroy", cloudinary_delete, public_id)
             except:
                 pass
     
-    current_user.profile_image = None
-    current_user.updated_at = datetime.utcnow()
-    db.commit()
+    user.profile_image = None
+    user.updated_at = datetime.utcnow()
+    await db.commit()
+    invalidate_user_cache(user.auth_uid)
+    bump("users")
+    audit_log.record("profile_image.delete", current_user.id)
     
     return {
         "message": "Imagen de perfil eliminada exitosamente"
@@ -313,49 +330,40 @@ async def delete_profile_image_endpoint(
 
 @router.get("/users", response_model=list)
 async def get_all_users(
-    current_user: SteamUser = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("users", "balances")),
+    db: AsyncSession = Depends(get_db)
 ):
-    from app.models.models import Deposit, PurchaseShare
-
-    users = db.query(SteamUser).all()
-    user_ids = [u.id for u in users]
-
-    # Subquery para depósitos
-    deposits_sum = dict(
-        db.query(Deposit.member_id, func.coalesce(func.sum(Deposit.amount), 0))
-        .filter(Deposit.member_id.in_(user_ids))
-        .group_by(Deposit.member_id)
-        .all()
-    )
-
-    # Subquery para gastos
-    expenses_sum = dict(
-        db.query(PurchaseShare.member_id, func.coalesce(func.sum(PurchaseShare.share_amount), 0))
-        .filter(PurchaseShare.member_id.in_(user_ids))
-        .group_by(PurchaseShare.member_id)
-        .all()
-    )
-
-    users_data = []
-    for user in users:
-        total_deposits = deposits_sum.get(user.id, 0)
-        total_expenses = expenses_sum.get(user.id, 0)
-        current_balance = total_deposits - total_expenses
-        user_data = {
-            "id": user.id,
-            "name": user.name,
-            "role": user.role,
-            "active": user.active,
-            "profile_image": user.profile_image,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at,
-            "auth_uid": str(user.auth_uid) if user.auth_uid else None,
-            "balance": {
-                "total_deposits": total_deposits,
-                "total_expenses": total_expenses,
-                "current_balance": current_balance
-            }
+    rows = (await db.execute(
+        select(
+            SteamUser.id,
+            SteamUser.name,
+            SteamUser.role,
+            SteamUser.active,
+            SteamUser.profile_image,
+            SteamUser.created_at,
+            SteamUser.updated_at,
+            SteamUser.auth_uid,
+            *balance_columns()
+        )
+        .outerjoin(Balance, Balance.member_id == SteamUser.id)
+    )).all()
+
+    users_data = [{
+        "id": row.id,
+        "name": row.name,
+        "role": row.role,
+        "active": row.active,
+        "profile_image": row.profile_image,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at,
+        "auth_uid": str(row.auth_uid) if row.auth_uid else None,
+        "balance": {
+            "total_deposits": row.total_deposits,
+            "total_expenses": row.total_expenses,
+            "total_adjustments": row.total_adjustments,
+            "current_balance": row.current_balance
         }
-        users_data.append(user_data)
-    return users_data
+    } for row in rows]
+    return json_response(users_data, response)
@@ -0,0 +1,232 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from datetime import date, datetime
+from typing import Optional
+
+from app.database import get_db
+from app.models import SteamUser
+from app.models.models import MonthlyCollection, MonthlyCollectionItem
+from app.utils.audit import audit_log
+from app.utils.auth import CurrentUser, get_current_active_user, require_master_role
+from app.utils.deposits import insert_deposits
+from app.utils.settings import app_settings
+from app.utils.responses import json_response
+from app.utils.versions import bump, conditional
+from app.schemas import schemas
+
+router = APIRouter(prefix="/collections", tags=["Monthly Collections"])
+
+
+async def existing_collection_id(db: AsyncSession, due_date: date) -> Optional[int]:
+    return await db.scalar(select(MonthlyCollection.id).where(MonthlyCollection.due_date == due_date))
+
+
+def duplicate_due_date(due_date: date, collection_id: Optional[int]) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail=f"Ya existe un cobro con vencimiento {due_date} (ID: {collection_id})"
+    )
+
+
+def summary_columns():
+    """Resumen de pagos de un cobro, para agregar sobre sus items en una sola consulta."""
+    item = MonthlyCollectionItem
+    return (
+        func.count(item.id).label("members"),
+        func.count(item.id).filter(item.paid).label("paid_count"),
+        func.coalesce(func.sum(item.amount), 0).label("total_expected"),
+        func.coalesce(func.sum(item.amount).filter(item.paid), 0).label("total_paid"),
+    )
+
+
+def summary(totals) -> dict:
+    """Completa los totales de summary_columns() con pendientes."""
+    return {
+        "members": totals["members"],
+        "paid_count": totals["paid_count"],
+        "unpaid_count": totals["members"] - totals["paid_count"],
+        "total_expected": totals["total_expected"],
+        "total_paid": totals["total_paid"],
+        "total_pending": totals["total_expected"] - totals["total_paid"]
+    }
+
+
+def collection_dict(collection) -> dict:
+    return {
+        "id": collection.id,
+        "due_date": collection.due_date,
+        "amount_per_member": collection.amount_per_member,
+        "created_at": collection.created_at
+    }
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_collection(
+    collection_data: schemas.MonthlyCollectionCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Abre un cobro y genera un item pendiente para cada miembro activo."""
+    existing = await existing_collection_id(db, collection_data.due_date)
+    if existing:
+        raise duplicate_due_date(collection_data.due_date, existing)
+
+    amount_per_member = collection_data.amount_per_member or app_settings.current.amount_per_member
+    collection = MonthlyCollection(
+        due_date=collection_data.due_date,
+        amount_per_member=int(amount_per_member)
+    )
+    db.add(collection)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Otro cobro con la misma fecha se creó entre la consulta y el INSERT
+        await db.rollback()
+        raise duplicate_due_date(collection_data.due_date, await existing_collection_id(db, collection_data.due_date))
+
+    # Un solo INSERT ... SELECT para todos los miembros activos
+    now = datetime.utcnow()
+    items = await db.execute(
+        insert(MonthlyCollectionItem.__table__).from_select(
+            ["collection_id", "member_id", "amount", "paid", "created_at"],
+            select(
+                literal(collection.id), SteamUser.id, literal(collection.amount_per_member),
+                literal(False), literal(now)
+            ).where(SteamUser.active == True)
+        )
+    )
+    await db.commit()
+    bump("collections")
+    audit_log.record("collection.create", current_user.id, {
+        "collection_id": collection.id, "due_date": collection.due_date.isoformat(),
+        "amount_per_member": collection.amount_per_member, "items_created": items.rowcount
+    })
+    await db.refresh(collection)
+
+    return {
+        "message": "Cobro creado exitosamente",
+        "collection": collection_dict(collection),
+        "items_created": items.rowcount,
+        "total_expected": items.rowcount * collection.amount_per_member
+    }
+
+
+@router.get("/")
+async def get_collections(
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("collections"))
+):
+    rows = (await db.execute(
+        select(MonthlyCollection, *summary_columns())
+        .outerjoin(MonthlyCollectionItem, MonthlyCollectionItem.collection_id == MonthlyCollection.id)
+        .group_by(MonthlyCollection.id)
+        .order_by(MonthlyCollection.due_date.desc())
+    )).all()
+    return json_response([
+        {**collection_dict(row.MonthlyCollection), "summary": summary(row._mapping)}
+        for row in rows
+    ], response)
+
+
+@router.get("/{collection_id}")
+async def get_collection(
+    collection_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    collection = await db.get(MonthlyCollection, collection_id)
+    if not collection:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cobro con ID {collection_id} no encontrado"
+        )
+
+    items = (await db.execute(
+        select(
+            MonthlyCollectionItem.id, MonthlyCollectionItem.member_id, SteamUser.name.label("member_name"),
+            MonthlyCollectionItem.amount, MonthlyCollectionItem.paid, MonthlyCollectionItem.paid_at
+        )
+        .join(SteamUser, SteamUser.id == MonthlyCollectionItem.member_id)
+        .where(MonthlyCollectionItem.collection_id == collection_id)
+        .order_by(SteamUser.name)
+    )).mappings().all()
+    # Los items ya están cargados: el resumen sale de ellos sin otra consulta
+    totals = {
+        "members": len(items),
+        "paid_count": sum(1 for item in items if item["paid"]),
+        "total_expected": sum(item["amount"] for item in items),
+        "total_paid": sum(item["amount"] for item in items if item["paid"])
+    }
+
+    return json_response({
+        **collection_dict(collection),
+        "summary": summary(totals),
+        "items": [dict(item) for item in items]
+    })
+
+
+@router.post("/{collection_id}/pay")
+async def pay_collection_items(
+    collection_id: int,
+    payment: schemas.CollectionPayment,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Marca como pagados los items pendientes de `member_ids` (o todos) con un solo UPDATE.
+
+    Con `record_deposit` registra además un depósito por cada pago, en la misma transacción.
+    """
+    collection = await db.get(MonthlyCollection, collection_id)
+    if not collection:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Cobro con ID {collection_id} no encontrado"
+        )
+
+    paid_at = payment.paid_at or datetime.utcnow()
+    stmt = (
+        update(MonthlyCollectionItem.__table__)
+        .where(
+            MonthlyCollectionItem.__table__.c.collection_id == collection_id,
+            MonthlyCollectionItem.__table__.c.paid == False
+        )
+        .values(paid=True, paid_at=paid_at)
+        .returning(MonthlyCollectionItem.__table__.c.member_id, MonthlyCollectionItem.__table__.c.amount)
+    )
+    if payment.member_ids is not None:
+        stmt = stmt.where(MonthlyCollectionItem.__table__.c.member_id.in_(payment.member_ids))
+    paid = (await db.execute(stmt)).all()
+
+    deposits = []
+    if payment.record_deposit and paid:
+        deposits = await insert_deposits(db, [
+            schemas.DepositCreate(
+                member_id=member_id,
+                amount=amount,
+                note=f"Cuota mensual {collection.due_date:%m/%Y}",
+                date=paid_at
+            )
+            for member_id, amount in paid
+        ])
+    await db.commit()
+    if paid:
+        bump("collections", *(("deposits", "balances") if deposits else ()))
+
+    paid_ids = {member_id for member_id, _ in paid}
+    if paid:
+        audit_log.record("collection.pay", current_user.id, {
+            "collection_id": collection_id, "member_ids": sorted(paid_ids),
+            "total_paid": sum(amount for _, amount in paid), "deposit_ids": [row["id"] for row in deposits]
+        })
+    return {
+        "message": f"{len(paid)} pagos registrados",
+        "paid_member_ids": sorted(paid_ids),
+        # Miembros pedidos sin item pendiente en este cobro (ya pagados o sin item)
+        "skipped_member_ids": sorted(set(payment.member_ids or []) - paid_ids),
+        "total_paid": sum(amount for _, amount in paid),
+        "deposits_created": len(deposits)
+    }
@@ -1,26 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy.orm.attributes import flag_modified
-from sqlalchemy import func, text
-from typing import List
+import json
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from typing import Optional
 from datetime import datetime
 
 from app.database import get_db
-from app.models import SteamUser, Deposit, PurchaseShare
-from app.utils.auth import get_current_active_user, require_master_role
+from app.models import SteamUser, Deposit, Balance
+from app.utils.auth import CurrentUser, get_current_active_user, require_master_role
+from app.utils.balances import apply_balance_deltas, balance_columns, rebuild_balances
+from app.utils.deposits import MAX_BULK_DEPOSITS, insert_deposits, read_deposit_csv, validate_deposit_rows
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
+from app.utils.responses import json_response, model_response
+from app.utils.audit import audit_log
+from app.utils.versions import bump, conditional
 from app.schemas import schemas
 
 router = APIRouter(prefix="/deposits", tags=["Deposits"])
 
+DEPOSIT_PAGE = TypeAdapter(schemas.Page[schemas.Deposit])
+
+# /bulk lee el cuerpo a mano para aceptar tres formatos; así /docs los muestra igual
+BULK_DEPOSITS_BODY = {
+    "required": True,
+    "content": {
+        "application/json": {
+            "schema": {
+                "type": "array",
+                "items": {"$ref": "#/components/schemas/DepositCreate"},
+                "maxItems": MAX_BULK_DEPOSITS
+            }
+        },
+        "text/csv": {
+            "schema": {"type": "string"},
+            "example": "member_id,amount,note,date\n2,10000,Cuota octubre,2026-10-01\n3,10000,,\n"
+        },
+        "multipart/form-data": {
+            "schema": {
+                "type": "object",
+                "properties": {"file": {"type": "string", "format": "binary", "description": "CSV con columnas member_id, amount, note, date"}},
+                "required": ["file"]
+            }
+        }
+    }
+}
+
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_deposit(
     deposit_data: schemas.DepositCreate,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(require_master_role)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
 ):
     
 
-    member = db.query(SteamUser).filter(SteamUser.id == deposit_data.member_id).first()
+    member = await db.get(SteamUser, deposit_data.member_id)
     if not member:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -36,8 +71,13 @@ async def create_deposit(
     )
     
     db.add(new_deposit)
-    db.commit()
-    db.refresh(new_deposit)
+    await apply_balance_deltas(db, deposits={member.id: int(new_deposit.amount)})
+    await db.commit()
+    bump("deposits", "balances")
+    audit_log.record("deposit.create", current_user.id, {
+        "deposit_id": new_deposit.id, "member_id": member.id, "amount": int(new_deposit.amount)
+    })
+    await db.refresh(new_deposit)
     
     return {
         "message": "Depósito registrado exitosamente",
@@ -52,15 +92,88 @@ async def create_deposit(
         }
     }
 
-@router.get("/user/{user_id}", response_model=List[schemas.Deposit])
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, openapi_extra={"requestBody": BULK_DEPOSITS_BODY})
+async def create_deposits_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Importa varios depósitos a la vez: un arreglo JSON de DepositCreate, o un CSV
+    (multipart con campo `file`, o cuerpo `text/csv`) con columnas member_id, amount, note, date.
+
+    Todo o nada: si alguna fila es inválida no se registra ninguna y se devuelven los errores
+    por fila.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            upload = (await request.form()).get("file")
+            if upload is None or isinstance(upload, str):
+                raise ValueError("Falta el archivo CSV en el campo 'file'")
+            rows = read_deposit_csv(await upload.read())
+        elif content_type.startswith("text/csv"):
+            rows = read_deposit_csv(await request.body())
+        else:
+            rows = json.loads(await request.body())
+            if not isinstance(rows, list):
+                raise ValueError("Se esperaba un arreglo JSON de depósitos")
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Archivo o cuerpo inválido: {exc}")
+
+    if not rows:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No hay depósitos para importar")
+    if len(rows) > MAX_BULK_DEPOSITS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Máximo {MAX_BULK_DEPOSITS} depósitos por importación"
+        )
+
+    deposits, errors = validate_deposit_rows(rows)
+    # Todos los miembros en una sola consulta
+    member_ids = {deposit.member_id for _, deposit in deposits}
+    members = dict((await db.execute(
+        select(SteamUser.id, SteamUser.name).where(SteamUser.id.in_(member_ids))
+    )).all()) if member_ids else {}
+    errors += [
+        {"row": number, "error": f"Usuario con ID {deposit.member_id} no encontrado"}
+        for number, deposit in deposits
+        if deposit.member_id not in members
+    ]
+    if errors:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": "No se registró ningún depósito", "errors": sorted(errors, key=lambda error: error["row"])}
+        )
+
+    inserted = await insert_deposits(db, [deposit for _, deposit in deposits])
+    await db.commit()
+    bump("deposits", "balances")
+    audit_log.record("deposit.bulk", current_user.id, {
+        "created": len(inserted), "total_amount": sum(row["amount"] for row in inserted),
+        "deposit_ids": [row["id"] for row in inserted]
+    })
+
+    return {
+        "message": f"{len(inserted)} depósitos registrados exitosamente",
+        "created": len(inserted),
+        "total_amount": sum(row["amount"] for row in inserted),
+        "results": [
+            {"row": number, "member_name": members[row["member_id"]], **row}
+            for number, row in enumerate(inserted, start=1)
+        ]
+    }
+
+@router.get("/user/{user_id}", response_model=schemas.Page[schemas.Deposit])
 async def get_user_deposits(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
 
-    user = db.query(SteamUser).filter(SteamUser.id == user_id).first()
+    user = await db.get(SteamUser, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,47 +181,44 @@ async def get_user_deposits(
         )
     
 
-    deposits = db.query(Deposit).filter(
-        Deposit.member_id == user_id
-    ).order_by(Deposit.date.desc()).all()
-    
-    return deposits
+    page = await fetch_page(
+        db, select(Deposit.__table__).where(Deposit.member_id == user_id),
+        Deposit.date, Deposit.id, cursor, limit, mappings=True
+    )
+    return model_response(DEPOSIT_PAGE, page)
 
-@router.get("/", response_model=List[schemas.Deposit])
+@router.get("/", response_model=schemas.Page[schemas.Deposit])
 async def get_all_deposits(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("deposits"))
 ):
-    deposits = db.query(Deposit).order_by(Deposit.date.desc()).all()
-    return deposits
+    page = await fetch_page(db, select(Deposit.__table__), Deposit.date, Deposit.id, cursor, limit, mappings=True)
+    return model_response(DEPOSIT_PAGE, page, response)
 
 @router.get("/balance/{user_id}")
 async def get_user_balance(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
 
-    user = db.query(SteamUser).filter(SteamUser.id == user_id).first()
-    if not user:
+    row = (await db.execute(
+        select(SteamUser, *balance_columns())
+        .outerjoin(Balance, Balance.member_id == SteamUser.id)
+        .where(SteamUser.id == user_id)
+    )).first()
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Usuario con ID {user_id} no encontrado"
         )
     
-
-    total_deposits = db.query(func.sum(Deposit.amount)).filter(
-        Deposit.member_id == user_id
-    ).scalar() or 0
-    
-
-    total_expenses = db.query(func.sum(PurchaseShare.share_amount)).filter(
-        PurchaseShare.member_id == user_id,
-        PurchaseShare.paid == True
-    ).scalar() or 0
-    
-    current_balance = int(total_deposits) - int(total_expenses)
+    user, total_deposits, total_expenses, total_adjustments, current_balance = row
     
     return {
         "user_id": user_id,
@@ -116,55 +226,51 @@ async def get_user_balance(
         "profile_image": user.profile_image,
         "total_deposits": int(total_deposits),
         "total_expenses": int(total_expenses),
-        "current_balance": current_balance
+        "total_adjustments": int(total_adjustments),
+        "current_balance": int(current_balance)
     }
 
 @router.get("/balances/all")
 async def get_all_balances(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("balances", "users"))
 ):
     
 
-    users = db.query(SteamUser).filter(SteamUser.active == True).all()
-    user_ids = [u.id for u in users]
-
-    # Subquery para depósitos
-    deposits_sum = dict(
-        db.query(Deposit.member_id, func.coalesce(func.sum(Deposit.amount), 0))
-        .filter(Deposit.member_id.in_(user_ids))
-        .group_by(Deposit.member_id)
-        .all()
-    )
-
-    # Subquery para gastos pagados
-    expenses_sum = dict(
-        db.query(PurchaseShare.member_id, func.coalesce(func.sum(PurchaseShare.share_amount), 0))
-        .filter(PurchaseShare.member_id.in_(user_ids), PurchaseShare.paid == True)
-        .group_by(PurchaseShare.member_id)
-        .all()
-    )
-
-    balances = []
-    for user in users:
-        total_deposits = int(deposits_sum.get(user.id, 0))
-        total_expenses = int(expenses_sum.get(user.id, 0))
-        current_balance = total_deposits - total_expenses
-        balances.append({
-            "user_id": user.id,
-            "user_name": user.name,
-            "profile_image": user.profile_image,
-            "role": user.role,
-            "total_deposits": total_deposits,
-            "total_expenses": total_expenses,
-            "current_balance": current_balance
-        })
+    rows = (await db.execute(
+        select(
+            SteamUser.id.label("user_id"),
+            SteamUser.name.label("user_name"),
+            SteamUser.profile_image,
+            SteamUser.role,
+            *balance_columns()
+        )
+        .outerjoin(Balance, Balance.member_id == SteamUser.id)
+        .where(SteamUser.active == True)
+    )).mappings()
 
+    balances = [dict(row) for row in rows]
     balances.sort(key=lambda x: x["current_balance"], reverse=True)
 
-    return {
+    return json_response({
         "balances": balances,
         "total_users": len(balances),
         "grand_total": sum(b["current_balance"] for b in balances)
-    }
+    }, response)
 
+@router.post("/balances/rebuild")
+async def rebuild_all_balances(
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    rebuilt = await rebuild_balances(db)
+    await db.commit()
+    bump("balances")
+    audit_log.record("balances.rebuild", current_user.id, {"rebuilt_members": rebuilt})
+
+    return {
+        "message": "Saldos recalculados desde el historial",
+        "rebuilt_members": rebuilt
+    }
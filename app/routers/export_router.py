@@ -0,0 +1,179 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from datetime import date, datetime
+from decimal import Decimal
+import csv
+import io
+import json
+
+from app.database import AsyncSessionLocal
+from app.models import SteamUser, Deposit, GameProposal, Vote, Purchase, PurchaseShare
+from app.utils.auth import CurrentUser, get_current_active_user
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+# Filas que se piden al cursor del servidor por cada viaje a la base de datos
+EXPORT_BATCH_SIZE = 500
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+DEPOSIT_COLUMNS = ["id", "member_id", "member_name", "amount", "note", "date", "created_at"]
+PURCHASE_COLUMNS = [
+    "id", "proposal_id", "title", "total_price", "purchaser_id", "owner_id",
+    "purchased_at", "was_on_sale", "original_price"
+]
+SHARE_COLUMNS = ["share_id", "member_id", "share_amount", "paid", "paid_at"]
+VOTE_COLUMNS = ["id", "proposal_id", "proposal_title", "member_id", "member_name", "vote", "voted_at"]
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return str(value)
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, default=_json_default, ensure_ascii=False) + "\n"
+
+
+async def _iter_rows(stmt):
+    """Recorre `stmt` con un cursor del lado del servidor; la sesión vive lo que dura el stream."""
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.mappings().partitions():
+            for row in partition:
+                yield row
+
+
+async def _stream_csv(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    async for row in rows:
+        count += 1
+        writer.writerow([
+            value.isoformat() if isinstance(value, (datetime, date)) else value
+            for value in (row[column] for column in columns)
+        ])
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def _stream_ndjson(rows, columns):
+    buffer = []
+    async for row in rows:
+        buffer.append(_dumps({column: row[column] for column in columns}))
+        if len(buffer) >= EXPORT_BATCH_SIZE:
+            yield "".join(buffer)
+            buffer.clear()
+    if buffer:
+        yield "".join(buffer)
+
+
+async def _stream_purchases_ndjson(rows):
+    # Las filas vienen ordenadas por compra: se agrupan sus participaciones sin cargar todo en memoria
+    current = None
+    async for row in rows:
+        if current is None or current["id"] != row["id"]:
+            if current is not None:
+                yield _dumps(current)
+            current = {column: row[column] for column in PURCHASE_COLUMNS}
+            current["shares"] = []
+        if row["share_id"] is not None:
+            current["shares"].append({column: row[column] for column in SHARE_COLUMNS})
+    if current is not None:
+        yield _dumps(current)
+
+
+def _export_response(chunks, name: str, fmt: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'}
+    )
+
+
+@router.get("/deposits")
+async def export_deposits(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    stmt = select(
+        Deposit.id,
+        Deposit.member_id,
+        SteamUser.name.label("member_name"),
+        Deposit.amount,
+        Deposit.note,
+        Deposit.date,
+        Deposit.created_at
+    ).join(SteamUser, SteamUser.id == Deposit.member_id).order_by(Deposit.date, Deposit.id)
+
+    rows = _iter_rows(stmt)
+    chunks = _stream_csv(rows, DEPOSIT_COLUMNS) if fmt == "csv" else _stream_ndjson(rows, DEPOSIT_COLUMNS)
+    return _export_response(chunks, "deposits", fmt)
+
+
+@router.get("/purchases")
+async def export_purchases(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    stmt = select(
+        Purchase.id,
+        Purchase.proposal_id,
+        Purchase.title,
+        Purchase.total_price,
+        Purchase.purchaser_id,
+        Purchase.owner_id,
+        Purchase.purchased_at,
+        Purchase.was_on_sale,
+        Purchase.original_price,
+        PurchaseShare.id.label("share_id"),
+        PurchaseShare.member_id,
+        PurchaseShare.share_amount,
+        PurchaseShare.paid,
+        PurchaseShare.paid_at
+    ).outerjoin(PurchaseShare, PurchaseShare.purchase_id == Purchase.id).order_by(
+        Purchase.purchased_at, Purchase.id, PurchaseShare.id
+    )
+
+    rows = _iter_rows(stmt)
+    if fmt == "csv":
+        # Una fila por participación, con los datos de la compra repetidos
+        chunks = _stream_csv(rows, PURCHASE_COLUMNS + SHARE_COLUMNS)
+    else:
+        chunks = _stream_purchases_ndjson(rows)
+    return _export_response(chunks, "purchases", fmt)
+
+
+@router.get("/votes")
+async def export_votes(
+    fmt: str = Query("csv", alias="format", pattern="^(csv|ndjson)$"),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    stmt = select(
+        Vote.id,
+        Vote.proposal_id,
+        GameProposal.title.label("proposal_title"),
+        Vote.member_id,
+        SteamUser.name.label("member_name"),
+        Vote.vote,
+        Vote.voted_at
+    ).join(GameProposal, GameProposal.id == Vote.proposal_id).join(
+        SteamUser, SteamUser.id == Vote.member_id
+    ).order_by(Vote.voted_at, Vote.id)
+
+    rows = _iter_rows(stmt)
+    chunks = _stream_csv(rows, VOTE_COLUMNS) if fmt == "csv" else _stream_ndjson(rows, VOTE_COLUMNS)
+    return _export_response(chunks, "votes", fmt)
@@ -1,56 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, select, update
+from typing import Optional
 from datetime import datetime
 
 from app.database import get_db
 from app.models import SteamUser, GameProposal, Vote
-from app.utils.auth import get_current_active_user, require_master_role
+from app.utils.auth import CurrentUser, get_current_active_user, require_master_role
 from app.schemas import schemas
-from app.models.models import ProposalsTurn
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
+from app.utils.audit import audit_log
+from app.utils.cycles import allocate_proposal_number
+from app.utils.events import Event, vote_events
+from app.utils.responses import model_response
+from app.utils.turn import proposals_turn
+from app.utils.versions import bump, conditional
+from app.utils.votes import apply_vote_deltas, delete_active_vote, reconcile_vote_counts, upsert_vote
 
 router = APIRouter(prefix="/proposals", tags=["Game Proposals"])
 
-SYSTEM_START_DATE = datetime(2025, 1, 1)
+PROPOSAL_PAGE = TypeAdapter(schemas.Page[schemas.GameProposalWithVotes])
 
 
 # Endpoint para alternar el booleano de proposals_turn (solo master)
 @router.post("/toggle-propuestas-turn", response_model=dict)
-async def toggle_proposals_turn_status(db: Session = Depends(get_db), current_user: SteamUser = Depends(require_master_role)):
-    row = db.query(ProposalsTurn).first()
-    if not row:
-        row = ProposalsTurn(status=True)
-        db.add(row)
-    else:
-        row.status = not row.status
-    db.commit()
-    db.refresh(row)
-    return {"status": row.status}
+async def toggle_proposals_turn_status(db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(require_master_role)):
+    turn_status = await proposals_turn.toggle(db)
+    bump("turn")
+    audit_log.record("proposals_turn.toggle", current_user.id, {"status": turn_status})
+    return {"status": turn_status}
 
 # Endpoint para consultar el valor de status en proposals_turn (cualquier usuario autenticado)
 @router.get("/turn-status", response_model=dict)
 async def get_proposals_turn_status(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("turn"))
 ):
-    row = db.query(ProposalsTurn).first()
-    if not row:
+    # Desde memoria: este endpoint no usa sesión de base de datos
+    turn_status = await proposals_turn.get()
+    if turn_status is None:
         return {"status": None, "message": "No existe registro en proposals_turn"}
-    return {"status": row.status}
+    return {"status": turn_status}
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
 async def create_proposal(
     proposal_data: schemas.GameProposalCreate,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
 
-    existing_proposal = db.query(GameProposal).filter(
+    existing_proposal = await db.scalar(select(GameProposal).where(
         GameProposal.proposer_id == current_user.id,
         GameProposal.status.in_(['proposed', 'voted'])
-    ).first()
+    ))
     
     if existing_proposal:
         raise HTTPException(
@@ -61,19 +66,7 @@ async def create_proposal(
 
     now = datetime.utcnow()
     month_year = int(now.strftime("%Y%m"))
-    
-
-    existing_month_proposal = db.query(GameProposal).filter(
-        GameProposal.month_year == month_year
-    ).first()
-    
-    if existing_month_proposal:
-
-        proposal_number = existing_month_proposal.proposal_number
-    else:
-
-        max_proposal = db.query(func.max(GameProposal.proposal_number)).scalar()
-        proposal_number = (max_proposal + 1) if max_proposal else 1
+    proposal_number = await allocate_proposal_number(db, month_year)
     
 
     new_proposal = GameProposal(
@@ -86,8 +79,12 @@ async def create_proposal(
     )
     
     db.add(new_proposal)
-    db.commit()
-    db.refresh(new_proposal)
+    await db.commit()
+    bump("proposals")
+    audit_log.record("proposal.create", current_user.id, {
+        "proposal_id": new_proposal.id, "title": new_proposal.title, "price": int(new_proposal.price)
+    })
+    await db.refresh(new_proposal)
     
     return {
         "message": "Propuesta creada exitosamente",
@@ -104,45 +101,91 @@ async def create_proposal(
         }
     }
 
-@router.get("/", response_model=List[schemas.GameProposalWithVotes])
+@router.get("/", response_model=schemas.Page[schemas.GameProposalWithVotes])
 async def get_all_proposals(
+    response: Response,
     status_filter: str = None,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("proposals"))
 ):
-    query = db.query(GameProposal)
+    stmt = select(GameProposal.__table__)
     if status_filter:
-        query = query.filter(GameProposal.status == status_filter)
-    proposals = query.order_by(GameProposal.proposed_at.desc()).all()
-    proposal_ids = [p.id for p in proposals]
-    # Subquery para contar votos por propuesta
-    votes_counts = dict(
-        db.query(Vote.proposal_id, func.count(Vote.id))
-        .filter(Vote.proposal_id.in_(proposal_ids))
-        .group_by(Vote.proposal_id)
-        .all()
-    ) if proposal_ids else {}
-    result = []
-    for proposal in proposals:
-        votes_count = votes_counts.get(proposal.id, 0)
-        base_data = schemas.GameProposal.model_validate(proposal).model_dump()
-        proposal_data = schemas.GameProposalWithVotes(**base_data, votes_count=votes_count)
-        result.append(proposal_data)
-    return result
+        stmt = stmt.where(GameProposal.status == status_filter)
+    page = await fetch_page(db, stmt, GameProposal.proposed_at, GameProposal.id, cursor, limit, mappings=True)
+    return model_response(PROPOSAL_PAGE, page, response)
+
+# Debe declararse antes de /{proposal_id}
+@router.get("/stream")
+async def stream_vote_events(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
+):
+    """Server-Sent Events con los cambios de votación: `snapshot` al conectar y luego
+    `vote`, `vote_moved`, `vote_removed` y `winner` a medida que ocurren. Al reconectar con
+    `Last-Event-ID` se reenvían solo los eventos perdidos, sin snapshot."""
+    header = request.headers.get("last-event-id")
+    last_event_id = int(header) if header and header.isdigit() else None
+    # Si la reconexión se completa con los eventos perdidos no se manda snapshot: uno con el id
+    # actual seguido de eventos más viejos haría retroceder los contadores del cliente
+    resumed = last_event_id is not None and vote_events.can_resume(last_event_id)
+    queue = vote_events.subscribe(last_event_id)
+    # Tomado antes de la consulta: todo evento con id mayor queda en la cola, después del snapshot
+    snapshot_id = vote_events.last_id
+    snapshot = None
+    try:
+        if not resumed:
+            tallies = dict((await db.execute(
+                select(GameProposal.id, GameProposal.votes_count).where(GameProposal.status == 'proposed')
+            )).all())
+            snapshot = Event(snapshot_id, "snapshot", {"tallies": tallies})
+    except Exception:
+        vote_events.unsubscribe(queue)
+        raise
+    finally:
+        # La conexión vuelve al pool: el stream puede durar horas y no necesita la sesión
+        await db.close()
+
+    return StreamingResponse(
+        vote_events.stream(queue, request.is_disconnected, initial=snapshot),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/reconcile-votes")
+async def reconcile_votes(
+    dry_run: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Verifica `votes_count` contra la tabla de votos y corrige las diferencias."""
+    mismatches = await reconcile_vote_counts(db, fix=not dry_run)
+    if mismatches and not dry_run:
+        await db.commit()
+        bump("proposals")
+        audit_log.record("votes.reconcile", current_user.id, {"mismatches": mismatches})
+
+    return {
+        "message": "Contadores de votos verificados" if dry_run else "Contadores de votos reconciliados",
+        "mismatches": mismatches
+    }
 
 @router.get("/my-vote")
 async def get_my_current_vote(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
 
-    vote = db.query(Vote, GameProposal).join(
+    vote = (await db.execute(select(Vote, GameProposal).join(
         GameProposal, Vote.proposal_id == GameProposal.id
-    ).filter(
+    ).where(
         Vote.member_id == current_user.id,
-        GameProposal.status == 'proposed'
-    ).first()
+        Vote.active
+    ))).first()
     
     if not vote:
         return {
@@ -152,9 +195,6 @@ async def get_my_current_vote(
     
     vote_obj, proposal = vote
     
-
-    total_votes = db.query(Vote).filter(Vote.proposal_id == proposal.id).count()
-    
     return {
         "has_vote": True,
         "vote": {
@@ -163,18 +203,18 @@ async def get_my_current_vote(
             "proposer_id": int(proposal.proposer_id),
             "price": int(proposal.price),
             "voted_at": vote_obj.voted_at,
-            "total_votes": total_votes
+            "total_votes": proposal.votes_count
         }
     }
 
 @router.get("/{proposal_id}")
 async def get_proposal_with_votes(
     proposal_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
-    proposal = db.query(GameProposal).filter(GameProposal.id == proposal_id).first()
+    proposal = await db.get(GameProposal, proposal_id)
     if not proposal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -182,9 +222,9 @@ async def get_proposal_with_votes(
         )
 
     # Obtener todos los votos y usuarios en un solo query
-    votes_detail = db.query(Vote, SteamUser).join(
+    votes_detail = (await db.execute(select(Vote, SteamUser).join(
         SteamUser, Vote.member_id == SteamUser.id
-    ).filter(Vote.proposal_id == proposal_id).all()
+    ).where(Vote.proposal_id == proposal_id))).all()
     votes_list = [
         {
             "member_id": vote.member_id,
@@ -193,12 +233,12 @@ async def get_proposal_with_votes(
         }
         for vote, user in votes_detail
     ]
-    total_votes = len(votes_list)
+    total_votes = proposal.votes_count
 
-    total_users = db.query(SteamUser).filter(
+    total_users = await db.scalar(select(func.count(SteamUser.id)).where(
         SteamUser.active == True,
         SteamUser.id != proposal.proposer_id
-    ).count()
+    ))
 
     return {
         "proposal": {
@@ -221,12 +261,16 @@ async def get_proposal_with_votes(
 @router.post("/{proposal_id}/vote")
 async def vote_proposal(
     proposal_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
-
-    proposal = db.query(GameProposal).filter(GameProposal.id == proposal_id).first()
+    # Una sola lectura para validar: la propuesta y el voto activo actual del miembro
+    current_vote = select(Vote.proposal_id).where(Vote.member_id == current_user.id, Vote.active).scalar_subquery()
+    proposal = (await db.execute(
+        select(GameProposal.title, GameProposal.status, GameProposal.proposer_id, current_vote.label("current_vote"))
+        .where(GameProposal.id == proposal_id)
+    )).first()
     if not proposal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -248,47 +292,42 @@ async def vote_proposal(
         )
     
 
-    existing_vote = db.query(Vote).join(
-        GameProposal, Vote.proposal_id == GameProposal.id
-    ).filter(
-        Vote.member_id == current_user.id,
-        GameProposal.status == 'proposed'
-    ).first()
-    
-    previous_proposal_title = None
-    vote_changed = False
-    
-    if existing_vote:
-
-        if existing_vote.proposal_id == proposal_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Ya has votado en esta propuesta"
-            )
-        
-
-        previous_proposal = db.query(GameProposal).filter(
-            GameProposal.id == existing_vote.proposal_id
-        ).first()
-        
-        previous_proposal_title = previous_proposal.title if previous_proposal else "Propuesta anterior"
-        
-        db.delete(existing_vote)
-        vote_changed = True
+    if proposal.current_vote == proposal_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ya has votado en esta propuesta"
+        )
     
-
-    new_vote = Vote(
-        proposal_id=proposal_id,
-        member_id=current_user.id,
-        vote=True
-    )
+    new_vote = await upsert_vote(db, proposal_id, current_user.id)
+    if not new_vote:
+        # La votación cambió entre la validación y el upsert (ganador elegido u otro voto del miembro)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No se pudo registrar el voto, la votación cambió. Intenta de nuevo"
+        )
     
-    db.add(new_vote)
-    db.commit()
-    db.refresh(new_vote)
+    previous_proposal_id = new_vote.previous_proposal_id
+    vote_changed = previous_proposal_id is not None
+    deltas = {proposal_id: 1}
+    if vote_changed:
+        deltas[previous_proposal_id] = -1
+    tallies = await apply_vote_deltas(db, deltas)
+    await db.commit()
+    bump("proposals")
     
-
-    total_votes = db.query(Vote).filter(Vote.proposal_id == proposal_id).count()
+    total_votes = tallies[proposal_id]
+    if vote_changed:
+        vote_events.publish("vote_moved", {
+            "member_id": current_user.id,
+            "from_proposal_id": previous_proposal_id,
+            "to_proposal_id": proposal_id,
+            "tallies": tallies
+        })
+    else:
+        vote_events.publish("vote", {"member_id": current_user.id, "proposal_id": proposal_id, "tallies": tallies})
+    audit_log.record("vote.move" if vote_changed else "vote.cast", current_user.id, {
+        "proposal_id": proposal_id, "previous_proposal_id": previous_proposal_id
+    })
     
     message = "Voto cambiado exitosamente" if vote_changed else "Voto registrado exitosamente"
     
@@ -305,6 +344,7 @@ async def vote_proposal(
     }
     
     if vote_changed:
+        previous_proposal_title = new_vote.previous_title or "Propuesta anterior"
         response["previous_vote"] = {
             "proposal_title": previous_proposal_title,
             "message": f"Tu voto anterior en '{previous_proposal_title}' ha sido eliminado"
@@ -314,102 +354,102 @@ async def vote_proposal(
 
 @router.delete("/my-vote")
 async def remove_my_vote(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
 
-    vote = db.query(Vote).join(
-        GameProposal, Vote.proposal_id == GameProposal.id
-    ).filter(
-        Vote.member_id == current_user.id,
-        GameProposal.status == 'proposed'
-    ).first()
-    
+    vote = await delete_active_vote(db, current_user.id)
     if not vote:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No tienes ningún voto activo para eliminar"
         )
     
-
-    proposal = db.query(GameProposal).filter(GameProposal.id == vote.proposal_id).first()
-    proposal_title = proposal.title if proposal else "Desconocido"
-    
-    db.delete(vote)
-    db.commit()
+    tallies = await apply_vote_deltas(db, {vote.proposal_id: -1})
+    await db.commit()
+    bump("proposals")
+    vote_events.publish("vote_removed", {
+        "member_id": current_user.id,
+        "proposal_id": vote.proposal_id,
+        "tallies": tallies
+    })
+    audit_log.record("vote.remove", current_user.id, {"proposal_id": vote.proposal_id})
     
     return {
         "message": "Voto eliminado exitosamente",
         "removed_from": {
             "proposal_id": vote.proposal_id,
-            "proposal_title": proposal_title
+            "proposal_title": vote.title
         }
     }
 
 @router.post("/{proposal_id}/select-winner")
 async def select_winner(
     proposal_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(require_master_role)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
 ):
     
-
-    winner_proposal = db.query(GameProposal).filter(GameProposal.id == proposal_id).first()
-    if not winner_proposal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Propuesta con ID {proposal_id} no encontrada"
-        )
-    
-    if winner_proposal.status != 'proposed':
+    # Cierra la ronda en una sola sentencia: la ganadora pasa a 'voted', el resto de las
+    # propuestas en votación a 'rejected' y sus votos quedan como historial
+    closed_votes = (
+        update(Vote.__table__)
+        .where(Vote.__table__.c.active)
+        .values(active=False)
+        .cte("closed_votes")
+    )
+    closed = (await db.execute(
+        update(GameProposal)
+        .where(GameProposal.status == 'proposed')
+        .values(status=case((GameProposal.id == proposal_id, 'voted'), else_='rejected'))
+        .returning(GameProposal.id, GameProposal.title, GameProposal.proposer_id, GameProposal.price, GameProposal.votes_count)
+        .add_cte(closed_votes)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    winner = next((row for row in closed if row.id == proposal_id), None)
+    if not winner:
+        await db.rollback()
+        current_status = await db.scalar(select(GameProposal.status).where(GameProposal.id == proposal_id))
+        if current_status is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Propuesta con ID {proposal_id} no encontrada"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"La propuesta debe estar en estado 'proposed'. Estado actual: {winner_proposal.status}"
+            detail=f"La propuesta debe estar en estado 'proposed'. Estado actual: {current_status}"
         )
-    
 
-    winner_votes = db.query(Vote).filter(Vote.proposal_id == proposal_id).count()
-
-    winner_proposal.status = 'voted'
-
-    rejected_proposals = db.query(GameProposal).filter(
-        GameProposal.status == 'proposed',
-        GameProposal.id != proposal_id
-    ).all()
-    rejected_ids = [prop.id for prop in rejected_proposals]
-    # Obtener votos de todas las rechazadas en una sola query
-    votes_by_proposal = dict(
-        db.query(Vote.proposal_id, func.count(Vote.id))
-        .filter(Vote.proposal_id.in_(rejected_ids))
-        .group_by(Vote.proposal_id)
-        .all()
-    ) if rejected_ids else {}
-    rejected_count = len(rejected_proposals)
-    rejected_list = []
-    for prop in rejected_proposals:
-        prop.status = 'rejected'
-        votes_count = votes_by_proposal.get(prop.id, 0)
-        rejected_list.append({
-            "id": prop.id,
-            "title": prop.title,
-            "votes": votes_count
-        })
+    rejected_list = [
+        {"id": row.id, "title": row.title, "votes": row.votes_count}
+        for row in sorted(closed, key=lambda row: row.id) if row.id != proposal_id
+    ]
 
-    db.commit()
+    await db.commit()
+    bump("proposals")
+    vote_events.publish("winner", {
+        "winner": {"id": winner.id, "title": winner.title, "votes": winner.votes_count},
+        "rejected": rejected_list
+    })
+    audit_log.record("proposal.select_winner", current_user.id, {
+        "proposal_id": winner.id, "votes": winner.votes_count,
+        "rejected_ids": [row["id"] for row in rejected_list]
+    })
 
     return {
         "message": "Ganador seleccionado exitosamente",
         "winner": {
-            "id": winner_proposal.id,
-            "title": winner_proposal.title,
-            "proposer_id": winner_proposal.proposer_id,
-            "price": winner_proposal.price,
-            "votes": winner_votes,
+            "id": winner.id,
+            "title": winner.title,
+            "proposer_id": winner.proposer_id,
+            "price": winner.price,
+            "votes": winner.votes_count,
             "status": "voted"
         },
         "rejected_proposals": {
-            "count": rejected_count,
+            "count": len(rejected_list),
             "proposals": rejected_list
         }
     }
@@ -417,18 +457,22 @@ async def select_winner(
 @router.delete("/{proposal_id}")
 async def delete_proposal(
     proposal_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(require_master_role)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
 ):
     
-    proposal = db.query(GameProposal).filter(GameProposal.id == proposal_id).first()
+    proposal = await db.get(GameProposal, proposal_id)
     if not proposal:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Propuesta con ID {proposal_id} no encontrada"
         )
     
-    db.delete(proposal)
-    db.commit()
+    await db.delete(proposal)
+    await db.commit()
+    bump("proposals")
+    audit_log.record("proposal.delete", current_user.id, {
+        "proposal_id": proposal_id, "title": proposal.title, "status": proposal.status
+    })
     
     return {"message": f"Propuesta '{proposal.title}' eliminada exitosamente"}
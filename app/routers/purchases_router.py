@@ -1,107 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select
+from typing import Optional
 from datetime import datetime
-from decimal import Decimal
 
-from app.database import get_db
-from app.models import SteamUser, GameProposal, Purchase, PurchaseShare, Deposit
-from app.utils.auth import get_current_active_user, require_master_role
+from app.database import get_db, run_with_retry
+from app.models import SteamUser, GameProposal, Purchase, PurchaseShare
+from app.utils.auth import CurrentUser, get_current_active_user, require_master_role
+from app.utils.balances import apply_balance_deltas, lock_member_balances
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
+from app.utils.settings import app_settings
+from app.utils.splits import Split, compute_split
+from app.utils.responses import model_response
+from app.utils.audit import audit_log
+from app.utils.versions import bump, conditional
 from app.schemas import schemas
 
 router = APIRouter(prefix="/purchases", tags=["Purchases"])
 
-@router.post("/from-proposal/{proposal_id}", status_code=status.HTTP_201_CREATED)
-async def create_purchase_from_proposal(
-    proposal_id: int,
-    purchase_data: schemas.PurchaseFromProposal,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(require_master_role)
-):
-    
+PURCHASE_PAGE = TypeAdapter(schemas.Page[schemas.Purchase])
 
-    proposal = db.query(GameProposal).filter(GameProposal.id == proposal_id).first()
-    if not proposal:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Propuesta con ID {proposal_id} no encontrada"
-        )
-    
-    if proposal.status != 'voted':
+def check_active_members(active_users: list, min_active_members: int):
+    if len(active_users) < min_active_members:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"La propuesta debe estar aprobada (voted). Estado actual: {proposal.status}"
+            detail=f"El grupo debe tener al menos {min_active_members} usuarios activos. Actualmente hay {len(active_users)}"
         )
-    
 
-    active_users = db.query(SteamUser).filter(SteamUser.active == True).all()
-    total_users = len(active_users)
-    
-    if total_users != 6:
+def check_member_balances(owner: SteamUser, owner_share: int, participants: list, share_per_other: int, balances: dict):
+    owner_balance = balances[owner.id]
+    if owner_balance < owner_share:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"El grupo debe tener exactamente 6 usuarios activos. Actualmente hay {total_users}"
-        )
-    
-
-    proposer = db.query(SteamUser).filter(SteamUser.id == proposal.proposer_id).first()
-    if not proposer:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Propietario con ID {proposal.proposer_id} no encontrado"
+            detail=f"Saldo insuficiente para {owner.name} (propietario). Necesita: ${owner_share:,}, Tiene: ${owner_balance:,}"
         )
-    
-
-    final_price = proposal.price
-    
-
-    was_on_sale = purchase_data.was_on_sale
-    original_price_value = int(purchase_data.original_price) if purchase_data.original_price else None
-    
-
-    final_price_int = int(final_price)
-    
-
-    owner_share = int(final_price_int * 0.40)
-    remaining = final_price_int - owner_share
-    share_per_other = int(remaining / 5)
-    
-
-    total_calculated = owner_share + (share_per_other * 5)
-    remainder = final_price_int - total_calculated
-    owner_final_share = owner_share + remainder
-    
 
-    def get_user_balance(user_id: int) -> int:
-        deposits = db.query(func.sum(Deposit.amount)).filter(Deposit.member_id == user_id).scalar() or 0
-        expenses = db.query(func.sum(PurchaseShare.share_amount)).filter(
-            PurchaseShare.member_id == user_id,
-            PurchaseShare.paid == True
-        ).scalar() or 0
-
-        return int(deposits) - int(expenses)
-    
-
-    proposer_balance = get_user_balance(proposer.id)
-    if proposer_balance < owner_final_share:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Saldo insuficiente para {proposer.name} (propietario). Necesita: ${owner_final_share:,}, Tiene: ${proposer_balance:,}"
-        )
-    
+    insufficient_balance_users = [
+        {
+            "name": user.name,
+            "required": share_per_other,
+            "balance": balances[user.id]
+        }
+        for user in participants
+        if balances[user.id] < share_per_other
+    ]
 
-    insufficient_balance_users = []
-    for user in active_users:
-        if user.id != proposer.id:
-            user_balance = get_user_balance(user.id)
-            if user_balance < share_per_other:
-                insufficient_balance_users.append({
-                    "name": user.name,
-                    "required": share_per_other,
-                    "balance": user_balance
-                })
-    
     if insufficient_balance_users:
         details = "\n".join([
             f"- {u['name']}: Necesita ${u['required']:,}, Tiene ${u['balance']:,}"
@@ -111,72 +55,127 @@ async def create_purchase_from_proposal(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Saldo insuficiente para algunos usuarios:\n{details}"
         )
-    
-
-    new_purchase = Purchase(
-        proposal_id=proposal_id,
-        title=proposal.title,
-        total_price=final_price,
-        purchaser_id=current_user.id,
-        owner_id=proposer.id,
-        was_on_sale=was_on_sale,
-        original_price=original_price_value
-    )
-    
-    db.add(new_purchase)
-    db.flush()
-    
 
+async def create_purchase_shares(db: AsyncSession, purchase: Purchase, owner: SteamUser, participants: list, split: Split, balances: dict) -> list:
+    """Crea las participaciones (ya pagadas) y descuenta los saldos en la transacción actual."""
+    paid_at = datetime.utcnow()
     shares_created = []
-    
-
-    new_owner_balance = proposer_balance - owner_final_share
-    owner_share_obj = PurchaseShare(
-        purchase_id=new_purchase.id,
-        member_id=proposer.id,
-        share_amount=owner_final_share,
-        paid=True,
-        paid_at=datetime.utcnow()
-    )
-    db.add(owner_share_obj)
-    shares_created.append({
-        "member_id": proposer.id,
-        "member_name": proposer.name,
-        "share_amount": owner_final_share,
-        "role": "PROPIETARIO (40%)",
-        "previous_balance": proposer_balance,
-        "new_balance": new_owner_balance
+    for user, share_amount, role in (
+        [(owner, split.owner_share, f"PROPIETARIO ({split.owner_percent}%)")]
+        + [(user, split.participant_share, f"PARTICIPANTE ({split.participant_percent}%)") for user in participants]
+    ):
+        db.add(PurchaseShare(
+            purchase_id=purchase.id,
+            member_id=user.id,
+            share_amount=share_amount,
+            paid=True,
+            paid_at=paid_at
+        ))
+        shares_created.append({
+            "member_id": user.id,
+            "member_name": user.name,
+            "share_amount": share_amount,
+            "role": role,
+            "previous_balance": balances[user.id],
+            "new_balance": balances[user.id] - share_amount
+        })
+
+    await apply_balance_deltas(db, expenses={
+        change["member_id"]: change["share_amount"] for change in shares_created
     })
-    
+    return shares_created
 
-    for user in active_users:
-        if user.id != proposer.id:
-            user_balance = get_user_balance(user.id)
-            new_user_balance = user_balance - share_per_other
-            
-            other_share = PurchaseShare(
-                purchase_id=new_purchase.id,
-                member_id=user.id,
-                share_amount=share_per_other,
-                paid=True,
-                paid_at=datetime.utcnow()
-            )
-            db.add(other_share)
-            
-            shares_created.append({
-                "member_id": user.id,
-                "member_name": user.name,
-                "share_amount": share_per_other,
-                "role": "PARTICIPANTE (12%)",
-                "previous_balance": user_balance,
-                "new_balance": new_user_balance
-            })
-    
+def split_breakdown(split: Split) -> dict:
+    # Se mantienen las claves históricas (40/60/12) por compatibilidad con el frontend
+    return {
+        "total_price": split.total,
+        "owner_pays_40%": split.owner_share,
+        "others_pay_60%": split.participants_total,
+        "per_other_user_12%": split.participant_share,
+        "owner_ratio": split.owner_percent,
+        "participants": split.participants
+    }
 
-    proposal.status = 'purchased'
-    
-    db.commit()
-    db.refresh(new_purchase)
+@router.post("/from-proposal/{proposal_id}", status_code=status.HTTP_201_CREATED)
+async def create_purchase_from_proposal(
+    proposal_id: int,
+    purchase_data: schemas.PurchaseFromProposal,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    settings = app_settings.current
+
+    async def purchase():
+        # Bloquea la propuesta: un doble clic espera aquí y luego ve el estado 'purchased'
+        proposal = await db.scalar(select(GameProposal).where(GameProposal.id == proposal_id).with_for_update())
+        if not proposal:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Propuesta con ID {proposal_id} no encontrada"
+            )
+        
+        if proposal.status != 'voted':
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La propuesta debe estar aprobada (voted). Estado actual: {proposal.status}"
+            )
+        
+
+        members = await lock_member_balances(db, include_ids=[proposal.proposer_id])
+        balances = {user.id: balance for user, balance in members}
+        active_users = [user for user, _ in members if user.active]
+        check_active_members(active_users, settings.min_active_members)
+        
+
+        proposer = next((user for user, _ in members if user.id == proposal.proposer_id), None)
+        if not proposer:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Propietario con ID {proposal.proposer_id} no encontrado"
+            )
+        
+
+        final_price = proposal.price
+        
+
+        was_on_sale = purchase_data.was_on_sale
+        original_price_value = int(purchase_data.original_price) if purchase_data.original_price else None
+        
+
+        participants = [user for user in active_users if user.id != proposer.id]
+        split = compute_split(final_price, len(participants), settings.owner_share_ratio)
+        check_member_balances(proposer, split.owner_share, participants, split.participant_share, balances)
+        
+
+        new_purchase = Purchase(
+            proposal_id=proposal_id,
+            title=proposal.title,
+            total_price=final_price,
+            purchaser_id=current_user.id,
+            owner_id=proposer.id,
+            was_on_sale=was_on_sale,
+            original_price=original_price_value
+        )
+        
+        db.add(new_purchase)
+        await db.flush()
+        
+
+        shares_created = await create_purchase_shares(db, new_purchase, proposer, participants, split, balances)
+
+        proposal.status = 'purchased'
+        
+        await db.commit()
+        return new_purchase, proposer, split, shares_created
+
+    # Solo se reintenta hasta el commit: lo que sigue corre una vez, con la compra ya registrada
+    new_purchase, proposer, split, shares_created = await run_with_retry(db, purchase)
+    bump("purchases", "balances", "proposals")
+    audit_log.record("purchase.from_proposal", current_user.id, {
+        "purchase_id": new_purchase.id, "proposal_id": proposal_id, "owner_id": proposer.id,
+        "total_price": new_purchase.total_price
+    })
+    await db.refresh(new_purchase)
     
     return {
         "message": "✅ Compra realizada y saldos descontados exitosamente",
@@ -191,14 +190,11 @@ async def create_purchase_from_proposal(
             "purchased_at": new_purchase.purchased_at
         },
         "shares_breakdown": {
-            "total_price": final_price_int,
-            "owner_pays_40%": owner_final_share,
-            "others_pay_60%": remaining,
-            "per_other_user_12%": share_per_other,
+            **split_breakdown(split),
             "proposer": {
                 "id": proposer.id,
                 "name": proposer.name,
-                "amount": owner_final_share
+                "amount": split.owner_share
             }
         },
         "balance_changes": shares_created
@@ -208,142 +204,60 @@ async def create_purchase_from_proposal(
 async def create_manual_purchase(
     purchase_data: schemas.PurchaseCreate,
     owner_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(require_master_role)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
 ):
-    
-
-    active_users = db.query(SteamUser).filter(SteamUser.active == True).all()
-    total_users = len(active_users)
-    
-    if total_users != 6:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"El grupo debe tener exactamente 6 usuarios activos. Actualmente hay {total_users}"
-        )
-    
-
-    owner = db.query(SteamUser).filter(
-        SteamUser.id == owner_id,
-        SteamUser.active == True
-    ).first()
-    
-    if not owner:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Usuario con ID {owner_id} no encontrado o no está activo"
-        )
-    
-
-    total_price = int(purchase_data.total_price)
-    owner_share = int(total_price * 0.40)
-    remaining = total_price - owner_share
-    share_per_other = int(remaining / 5)
-    
-
-    total_calculated = owner_share + (share_per_other * 5)
-    remainder = total_price - total_calculated
-    owner_final_share = owner_share + remainder
-    
-
-    def get_user_balance(user_id: int) -> int:
-        deposits = db.query(func.sum(Deposit.amount)).filter(Deposit.member_id == user_id).scalar() or 0
-        expenses = db.query(func.sum(PurchaseShare.share_amount)).filter(
-            PurchaseShare.member_id == user_id,
-            PurchaseShare.paid == True
-        ).scalar() or 0
-
-        return int(deposits) - int(expenses)
-    
-
-    owner_balance = get_user_balance(owner.id)
-    if owner_balance < owner_final_share:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Saldo insuficiente para {owner.name} (propietario). Necesita: ${owner_final_share:,}, Tiene: ${owner_balance:,}"
-        )
-    
-
-    insufficient_balance_users = []
-    for user in active_users:
-        if user.id != owner.id:
-            user_balance = get_user_balance(user.id)
-            if user_balance < share_per_other:
-                insufficient_balance_users.append({
-                    "name": user.name,
-                    "required": share_per_other,
-                    "balance": user_balance
-                })
-    
-    if insufficient_balance_users:
-        details = "\n".join([
-            f"- {u['name']}: Necesita ${u['required']:,}, Tiene ${u['balance']:,}"
-            for u in insufficient_balance_users
-        ])
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Saldo insuficiente para algunos usuarios:\n{details}"
+    settings = app_settings.current
+
+    async def purchase():
+        members = await lock_member_balances(db)
+        balances = {user.id: balance for user, balance in members}
+        active_users = [user for user, _ in members]
+        check_active_members(active_users, settings.min_active_members)
+        
+
+        owner = next((user for user in active_users if user.id == owner_id), None)
+        
+        if not owner:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Usuario con ID {owner_id} no encontrado o no está activo"
+            )
+        
+
+        total_price = int(purchase_data.total_price)
+        participants = [user for user in active_users if user.id != owner.id]
+        split = compute_split(total_price, len(participants), settings.owner_share_ratio)
+        check_member_balances(owner, split.owner_share, participants, split.participant_share, balances)
+        
+
+        new_purchase = Purchase(
+            proposal_id=None,
+            title=purchase_data.title,
+            total_price=total_price,
+            purchaser_id=current_user.id,
+            owner_id=owner.id,
+            was_on_sale=purchase_data.was_on_sale,
+            original_price=purchase_data.original_price
         )
-    
+        
+        db.add(new_purchase)
+        await db.flush()
+        
 
-    new_purchase = Purchase(
-        proposal_id=None,
-        title=purchase_data.title,
-        total_price=total_price,
-        purchaser_id=current_user.id,
-        owner_id=owner.id,
-        was_on_sale=purchase_data.was_on_sale,
-        original_price=purchase_data.original_price
-    )
-    
-    db.add(new_purchase)
-    db.flush()
-    
+        shares_created = await create_purchase_shares(db, new_purchase, owner, participants, split, balances)
 
-    shares_created = []
-    
+        await db.commit()
+        return new_purchase, owner, split, shares_created
 
-    owner_share_obj = PurchaseShare(
-        purchase_id=new_purchase.id,
-        member_id=owner.id,
-        share_amount=owner_final_share,
-        paid=True,
-        paid_at=datetime.utcnow()
-    )
-    db.add(owner_share_obj)
-    shares_created.append({
-        "member_id": owner.id,
-        "member_name": owner.name,
-        "share_amount": owner_final_share,
-        "role": "PROPIETARIO (40%)",
-        "previous_balance": owner_balance,
-        "new_balance": owner_balance - owner_final_share
+    # Solo se reintenta hasta el commit: lo que sigue corre una vez, con la compra ya registrada
+    new_purchase, owner, split, shares_created = await run_with_retry(db, purchase)
+    bump("purchases", "balances")
+    audit_log.record("purchase.manual", current_user.id, {
+        "purchase_id": new_purchase.id, "owner_id": owner.id, "total_price": new_purchase.total_price
     })
-    
+    await db.refresh(new_purchase)
 
-    for user in active_users:
-        if user.id != owner.id:
-            user_balance = get_user_balance(user.id)
-            share = PurchaseShare(
-                purchase_id=new_purchase.id,
-                member_id=user.id,
-                share_amount=share_per_other,
-                paid=True,
-                paid_at=datetime.utcnow()
-            )
-            db.add(share)
-            shares_created.append({
-                "member_id": user.id,
-                "member_name": user.name,
-                "share_amount": share_per_other,
-                "role": "PARTICIPANTE (12%)",
-                "previous_balance": user_balance,
-                "new_balance": user_balance - share_per_other
-            })
-    
-    db.commit()
-    db.refresh(new_purchase)
-    
     return {
         "message": "✅ Compra manual realizada y saldos descontados exitosamente",
         "purchase": {
@@ -359,35 +273,38 @@ async def create_manual_purchase(
             "purchased_at": new_purchase.purchased_at
         },
         "shares_breakdown": {
-            "total_price": total_price,
-            "owner_pays_40%": owner_final_share,
-            "others_pay_60%": remaining,
-            "per_other_user_12%": share_per_other,
+            **split_breakdown(split),
             "owner": {
                 "id": owner.id,
                 "name": owner.name,
-                "amount": owner_final_share
+                "amount": split.owner_share
             }
         },
         "balance_changes": shares_created
     }
 
-@router.get("/", response_model=List[schemas.Purchase])
+@router.get("/", response_model=schemas.Page[schemas.Purchase])
 async def get_all_purchases(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("purchases"))
 ):
-    purchases = db.query(Purchase).order_by(Purchase.purchased_at.desc()).all()
-    return purchases
+    page = await fetch_page(
+        db, select(Purchase.__table__), Purchase.purchased_at, Purchase.id, cursor, limit, mappings=True
+    )
+    return model_response(PURCHASE_PAGE, page, response)
 
 @router.get("/{purchase_id}")
 async def get_purchase_with_shares(
     purchase_id: int,
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
-    purchase = db.query(Purchase).filter(Purchase.id == purchase_id).first()
+    purchase = await db.get(Purchase, purchase_id)
     if not purchase:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -395,9 +312,9 @@ async def get_purchase_with_shares(
         )
     
 
-    shares = db.query(PurchaseShare, SteamUser).join(
+    shares = (await db.execute(select(PurchaseShare, SteamUser).join(
         SteamUser, PurchaseShare.member_id == SteamUser.id
-    ).filter(PurchaseShare.purchase_id == purchase_id).all()
+    ).where(PurchaseShare.purchase_id == purchase_id))).all()
 
     shares_list = [
         {
@@ -412,12 +329,12 @@ async def get_purchase_with_shares(
     ]
 
     # Agregación SQL para totales y conteos
-    agg = db.query(
+    agg = (await db.execute(select(
         func.coalesce(func.sum(PurchaseShare.share_amount).filter(PurchaseShare.paid == True), 0),
         func.coalesce(func.sum(PurchaseShare.share_amount).filter(PurchaseShare.paid == False), 0),
         func.count().filter(PurchaseShare.paid == True),
         func.count().filter(PurchaseShare.paid == False)
-    ).filter(PurchaseShare.purchase_id == purchase_id).one()
+    ).where(PurchaseShare.purchase_id == purchase_id))).one()
     total_paid, total_pending, users_paid, users_pending = agg
 
     return {
@@ -444,16 +361,16 @@ async def get_purchase_with_shares(
 
 @router.get("/my-shares/pending")
 async def get_my_pending_shares(
-    db: Session = Depends(get_db),
-    current_user: SteamUser = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(get_current_active_user)
 ):
     
-    pending_shares = db.query(PurchaseShare, Purchase).join(
+    pending_shares = (await db.execute(select(PurchaseShare, Purchase).join(
         Purchase, PurchaseShare.purchase_id == Purchase.id
-    ).filter(
+    ).where(
         PurchaseShare.member_id == current_user.id,
         PurchaseShare.paid == False
-    ).all()
+    ))).all()
     
     pending_list = [
         {
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db
+from app.utils.audit import audit_log
+from app.utils.auth import CurrentUser, get_current_active_user, require_master_role
+from app.utils.settings import app_settings
+from app.utils.versions import bump, conditional
+from app.schemas import schemas
+
+router = APIRouter(prefix="/settings", tags=["Settings"])
+
+
+@router.get("/", response_model=schemas.AppSettings)
+async def get_settings(
+    response: Response,
+    current_user: CurrentUser = Depends(get_current_active_user),
+    etag: None = Depends(conditional("settings"))
+):
+    return app_settings.current
+
+
+@router.put("/", response_model=schemas.AppSettings)
+async def update_settings(
+    changes: schemas.AppSettingsUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: CurrentUser = Depends(require_master_role)
+):
+    """Actualiza solo los campos enviados; se aplican desde la siguiente petición."""
+    new_settings = await app_settings.write(db, changes)
+    await db.commit()
+    app_settings.replace(new_settings)
+    bump("settings")
+    audit_log.record("settings.update", current_user.id, changes.model_dump(mode="json", exclude_none=True))
+    return new_settings
+
+
+@router.post("/reload", response_model=schemas.AppSettings)
+async def reload_settings(current_user: CurrentUser = Depends(require_master_role)):
+    """Vuelve a leer la tabla `settings`, p. ej. después de editarla con SQL."""
+    new_settings = await app_settings.load()
+    bump("settings")
+    return new_settings
@@ -2,7 +2,7 @@
 
 from pydantic import BaseModel, EmailStr, Field, validator, field_serializer
 from pydantic import ConfigDict
-from typing import Optional, List
+from typing import Generic, Optional, List, TypeVar
 from datetime import datetime, date
 from decimal import Decimal
 from uuid import UUID
@@ -39,7 +39,8 @@ class MonthlyCollectionBase(BaseModel):
     amount_per_member: Decimal = Field(..., gt=0)
 
 class MonthlyCollectionCreate(MonthlyCollectionBase):
-    pass
+    # Sin monto se usa el amount_per_member de la configuración
+    amount_per_member: Optional[Decimal] = Field(default=None, gt=0)
 
 class MonthlyCollection(MonthlyCollectionBase):
     id: int
@@ -68,6 +69,12 @@ class MonthlyCollectionItem(MonthlyCollectionItemBase):
     
     model_config = ConfigDict(from_attributes=True)
 
+class CollectionPayment(BaseModel):
+    # Sin member_ids se marcan todos los pendientes del cobro
+    member_ids: Optional[List[int]] = None
+    record_deposit: bool = False
+    paid_at: Optional[datetime] = None
+
 
 
 
@@ -201,6 +208,17 @@ class Setting(SettingBase):
     updated_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+class AppSettings(BaseModel):
+    """Configuración del grupo; cada campo es una fila de `settings` (key = nombre del campo)."""
+    owner_share_ratio: float = Field(default=0.4, ge=0, le=1)
+    min_active_members: int = Field(default=2, ge=2)
+    amount_per_member: int = Field(default=10000, gt=0)
+
+class AppSettingsUpdate(BaseModel):
+    owner_share_ratio: Optional[float] = Field(default=None, ge=0, le=1)
+    min_active_members: Optional[int] = Field(default=None, ge=2)
+    amount_per_member: Optional[int] = Field(default=None, gt=0)
+
 class AuditLogCreate(BaseModel):
     actor_member_id: Optional[int] = None
     action: str
@@ -211,6 +229,12 @@ class AuditLog(AuditLogCreate):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 class MemberBalance(BaseModel):
     member_id: int
     member_name: str
@@ -9,6 +9,10 @@ from .auth import (
     get_current_user,
     get_current_active_user,
     require_master_role,
+    invalidate_user_cache,
+    get_supabase,
+    get_supabase_admin,
+    CurrentUser,
     REFRESH_COOKIE_NAME,
     ACCESS_COOKIE_NAME
 )
@@ -24,6 +28,10 @@ __all__ = [
     "get_current_user",
     "get_current_active_user",
     "require_master_role",
+    "invalidate_user_cache",
+    "get_supabase",
+    "get_supabase_admin",
+    "CurrentUser",
     "REFRESH_COOKIE_NAME",
     "ACCESS_COOKIE_NAME"
 ]
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.database import AsyncSessionLocal
+from app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Registro de auditoría fuera del camino de la petición: los endpoints encolan el evento
+# después del commit y una tarea de fondo los escribe en lotes con un INSERT multi-fila.
+# La cola es acotada: si la base no da abasto se descartan eventos (y se cuentan) en vez
+# de frenar las peticiones. Al apagar la app se escribe lo que quede en la cola.
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "1000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "100"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "1"))
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        queue_size: int = AUDIT_QUEUE_SIZE,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_seconds: float = AUDIT_FLUSH_SECONDS,
+        session_factory=AsyncSessionLocal
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._task: Optional[asyncio.Task] = None
+        self._flushing: Optional[asyncio.Future] = None
+        self._batch: List[dict] = []
+        self.stats = {"written": 0, "dropped": 0, "failed": 0}
+
+    def record(self, action: str, actor_member_id: Optional[int] = None, payload: Optional[Dict[str, Any]] = None):
+        """Encola un evento sin esperar. `payload` debe ser serializable a JSON."""
+        event = {
+            "actor_member_id": actor_member_id,
+            "action": action,
+            "payload": payload,
+            "created_at": datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            logger.warning("Cola de auditoría llena, evento descartado: %s", action)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Detiene la tarea de fondo y escribe los eventos pendientes."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._flushing is not None:
+            # Lote que la tarea estaba escribiendo cuando se canceló
+            await self._flushing
+            self._flushing = None
+        batch, self._batch = self._batch, []
+        await self._write(batch)
+        while not self._queue.empty():
+            await self._write(self._take(self.batch_size))
+        # La cola queda ligada al loop actual; un nuevo start() (p. ej. en tests) usa otra
+        self._queue = asyncio.Queue(maxsize=self._queue.maxsize)
+
+    def _take(self, limit: int) -> List[dict]:
+        batch = []
+        while len(batch) < limit and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self._queue.get())
+            # Junta lo que llegue durante flush_seconds (o hasta llenar el lote)
+            deadline = loop.time() + self.flush_seconds
+            while len(self._batch) < self.batch_size:
+                self._batch.extend(self._take(self.batch_size - len(self._batch)))
+                remaining = deadline - loop.time()
+                if len(self._batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            # shield: cancelar la tarea al apagar no corta un INSERT a medias
+            self._flushing = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._flushing)
+            self._flushing = None
+
+    async def _write(self, batch: List[dict]):
+        if not batch:
+            return
+        try:
+            async with self._session_factory() as db:
+                await db.execute(insert(AuditLog.__table__), batch)
+                await db.commit()
+            self.stats["written"] += len(batch)
+        except Exception:
+            self.stats["failed"] += len(batch)
+            logger.exception("No se pudieron escribir %d eventos de auditoría", len(batch))
+
+
+audit_log = AuditWriter()
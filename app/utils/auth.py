@@ -1,15 +1,23 @@
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, TYPE_CHECKING
+from uuid import UUID
+import time
 from fastapi import Depends, HTTPException, status, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
-from supabase import create_client, Client
+from sqlalchemy import select
 import os
 from dotenv import load_dotenv
 
-from app.database import get_db
+from app.database import AsyncSessionLocal
 from app.models import SteamUser
+from app.utils.cache import TTLCache
+from app.utils.external import run_external
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
@@ -26,12 +34,63 @@ REFRESH_COOKIE_NAME = "steam_refresh_token"
 COOKIE_DOMAIN = os.getenv("COOKIE_DOMAIN", "localhost")
 COOKIE_SECURE = os.getenv("COOKIE_SECURE", "False").lower() == "true"
 COOKIE_SAMESITE = os.getenv("COOKIE_SAMESITE", "lax")
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "1024"))
+
+# Los clientes de Supabase se crean en el primer uso: importar el SDK cuesta cientos de ms
+# y no debe retrasar el arranque (ni /health) en cada cold start
+@lru_cache(maxsize=None)
+def get_supabase() -> "Client":
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+@lru_cache(maxsize=None)
+def get_supabase_admin() -> "Client":
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
 
 security = HTTPBearer(auto_error=False)
 
+@dataclass(frozen=True)
+class CurrentUser:
+    """Copia ligera del usuario autenticado, independiente de la sesión de base de datos.
+
+    Los endpoints que necesitan modificar al usuario deben cargarlo con `db.get(SteamUser, id)`
+    y llamar a `invalidate_user_cache` tras el commit.
+    """
+    id: int
+    name: str
+    role: str
+    active: bool
+    auth_uid: Optional[UUID]
+    profile_image: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+
+    @classmethod
+    def from_model(cls, user: SteamUser) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            name=user.name,
+            role=user.role,
+            active=user.active,
+            auth_uid=user.auth_uid,
+            profile_image=user.profile_image,
+            created_at=user.created_at,
+            updated_at=user.updated_at
+        )
+
+# Claims ya verificados por token y usuarios por auth_uid: evitan el HMAC y la consulta en cada petición
+_token_cache = TTLCache(maxsize=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+_user_cache = TTLCache(maxsize=AUTH_CACHE_MAX_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_user_cache(auth_uid: Optional[Any] = None):
+    """Descarta el usuario cacheado (o todos si no se indica auth_uid)."""
+    if auth_uid is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(str(auth_uid))
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -113,11 +172,16 @@ async def get_token_from_cookie_or_header(
     
     return token
 
-async def get_current_user(
-    token: str = Depends(get_token_from_cookie_or_header),
-    db: Session = Depends(get_db)
-) -> SteamUser:
-    payload = verify_token(token)
+def verify_access_token_cached(token: str) -> Dict[str, Any]:
+    payload = _token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        # Nunca se cachea más allá de la expiración del propio token
+        _token_cache.set(token, payload, ttl=payload.get("exp", 0) - time.time())
+    return payload
+
+async def get_current_user(token: str = Depends(get_token_from_cookie_or_header)) -> CurrentUser:
+    payload = verify_access_token_cached(token)
     
     if payload.get("type") != "access":
         raise HTTPException(
@@ -132,12 +196,19 @@ async def get_current_user(
             detail="Token inválido"
         )
     
-    user = db.query(SteamUser).filter(SteamUser.auth_uid == auth_uid).first()
+    user = _user_cache.get(str(auth_uid))
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Usuario no encontrado"
-        )
+        # Sesión propia solo ante un fallo de caché: con la caché caliente la autenticación
+        # no abre sesión ni toma conexiones del pool
+        async with AsyncSessionLocal() as db:
+            db_user = await db.scalar(select(SteamUser).where(SteamUser.auth_uid == auth_uid))
+        if db_user is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuario no encontrado"
+            )
+        user = CurrentUser.from_model(db_user)
+        _user_cache.set(str(auth_uid), user)
     
     if not user.active:
         raise HTTPException(
@@ -148,8 +219,8 @@ async def get_current_user(
     return user
 
 async def get_current_active_user(
-    current_user: SteamUser = Depends(get_current_user)
-) -> SteamUser:
+    current_user: CurrentUser = Depends(get_current_user)
+) -> CurrentUser:
     if not current_user.active:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -158,8 +229,8 @@ async def get_current_active_user(
     return current_user
 
 async def require_master_role(
-    current_user: SteamUser = Depends(get_current_active_user)
-) -> SteamUser:
+    current_user: CurrentUser = Depends(get_current_active_user)
+) -> CurrentUser:
     if current_user.role != "master":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -167,53 +238,59 @@ async def require_master_role(
         )
     return current_user
 
-def register_user_supabase(email: str, password: str, name: str) -> Dict[str, Any]:
+async def register_user_supabase(email: str, password: str, name: str) -> Dict[str, Any]:
     try:
-        response = supabase_admin.auth.admin.create_user({
+        response = await run_external("supabase.create_user", lambda: get_supabase_admin().auth.admin.create_user({
             "email": email,
             "password": password,
             "email_confirm": True,
             "user_metadata": {
                 "name": name
             }
-        })
+        }))
         
         return {
             "auth_uid": response.user.id,
             "email": response.user.email,
             "metadata": response.user.user_metadata
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Error al registrar usuario en Supabase: {str(e)}"
         )
 
-def login_user_supabase(email: str, password: str) -> Dict[str, Any]:
+async def login_user_supabase(email: str, password: str) -> Dict[str, Any]:
     try:
-        response = supabase.auth.sign_in_with_password({
+        response = await run_external("supabase.sign_in", lambda: get_supabase().auth.sign_in_with_password({
             "email": email,
             "password": password
-        })
+        }))
         
         return {
             "auth_uid": response.user.id,
             "email": response.user.email,
             "session": response.session
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Credenciales inválidas"
         )
 
-def verify_supabase_token(token: str) -> Dict[str, Any]:
+async def verify_supabase_token(token: str) -> Dict[str, Any]:
     try:
-        response = supabase.auth.get_user(token)
+        response = await run_external("supabase.get_user", lambda: get_supabase().auth.get_user(token))
         return {
             "auth_uid": response.user.id,
             "email": response.user.email
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -0,0 +1,156 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import SteamUser, Deposit, PurchaseShare, Balance
+from app.models.models import Adjustment
+
+# Saldo materializado: la tabla `balance` se actualiza en la misma transacción
+# que cada depósito, participación pagada o ajuste, así las lecturas son un lookup por member_id.
+#
+# current_balance = total_deposits - total_expenses + total_adjustments
+
+
+def balance_columns():
+    """Columnas de saldo listas para un outer join con `Balance` (0 si el miembro no tiene fila)."""
+    return (
+        func.coalesce(Balance.total_deposits, 0).label("total_deposits"),
+        func.coalesce(Balance.total_expenses, 0).label("total_expenses"),
+        func.coalesce(Balance.total_adjustments, 0).label("total_adjustments"),
+        func.coalesce(Balance.current_balance, 0).label("current_balance"),
+    )
+
+
+async def apply_balance_deltas(
+    db: AsyncSession,
+    deposits: Optional[Dict[int, int]] = None,
+    expenses: Optional[Dict[int, int]] = None,
+    adjustments: Optional[Dict[int, int]] = None,
+) -> None:
+    """Suma los movimientos de cada miembro a su fila de `balance` con un único upsert.
+
+    No hace commit: debe llamarse dentro de la transacción que registra el movimiento.
+    """
+    deposits = deposits or {}
+    expenses = expenses or {}
+    adjustments = adjustments or {}
+    member_ids = set(deposits) | set(expenses) | set(adjustments)
+    if not member_ids:
+        return
+
+    now = datetime.utcnow()
+    rows = []
+    for member_id in sorted(member_ids):
+        deposit_delta = int(deposits.get(member_id, 0))
+        expense_delta = int(expenses.get(member_id, 0))
+        adjustment_delta = int(adjustments.get(member_id, 0))
+        rows.append({
+            "member_id": member_id,
+            "total_deposits": deposit_delta,
+            "total_expenses": expense_delta,
+            "total_adjustments": adjustment_delta,
+            "current_balance": deposit_delta - expense_delta + adjustment_delta,
+            "last_updated": now
+        })
+
+    stmt = insert(Balance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Balance.member_id],
+        set_={
+            "total_deposits": Balance.total_deposits + stmt.excluded.total_deposits,
+            "total_expenses": Balance.total_expenses + stmt.excluded.total_expenses,
+            "total_adjustments": Balance.total_adjustments + stmt.excluded.total_adjustments,
+            "current_balance": Balance.current_balance + stmt.excluded.current_balance,
+            "last_updated": stmt.excluded.last_updated
+        }
+    )
+    await db.execute(stmt)
+
+
+async def lock_member_balances(
+    db: AsyncSession,
+    include_ids: Iterable[int] = ()
+) -> List[Tuple[SteamUser, int]]:
+    """Miembros activos (más `include_ids`) con su saldo, bloqueando sus filas de `balance`.
+
+    Las filas se bloquean en orden de member_id, así dos compras concurrentes se
+    serializan sin deadlock y la segunda lee los saldos ya descontados por la primera.
+    """
+    include_ids = list(include_ids)
+    members_filter = or_(SteamUser.active == True, SteamUser.id.in_(include_ids)) if include_ids else SteamUser.active == True
+
+    # FOR UPDATE no admite el lado nulo de un outer join: se garantiza la fila antes de bloquear
+    ensure_rows = insert(Balance).from_select(
+        ["member_id", "total_deposits", "total_expenses", "total_adjustments", "current_balance", "last_updated"],
+        select(SteamUser.id, literal(0), literal(0), literal(0), literal(0), func.now()).where(members_filter)
+    ).on_conflict_do_nothing(index_elements=[Balance.member_id])
+    await db.execute(ensure_rows)
+
+    rows = (await db.execute(
+        select(SteamUser, Balance.current_balance)
+        .join(Balance, Balance.member_id == SteamUser.id)
+        .where(members_filter)
+        .order_by(SteamUser.id)
+        .with_for_update(of=Balance)
+    )).all()
+    return [(user, int(current_balance)) for user, current_balance in rows]
+
+
+async def rebuild_balances(db: AsyncSession) -> int:
+    """Recalcula `balance` desde el historial (depósitos, participaciones pagadas y ajustes).
+
+    Devuelve el número de filas escritas. No hace commit.
+    """
+    deposits_sum = (
+        select(Deposit.member_id, func.sum(Deposit.amount).label("amount"))
+        .group_by(Deposit.member_id)
+        .subquery()
+    )
+    expenses_sum = (
+        select(PurchaseShare.member_id, func.sum(PurchaseShare.share_amount).label("amount"))
+        .where(PurchaseShare.paid == True)
+        .group_by(PurchaseShare.member_id)
+        .subquery()
+    )
+    adjustments_sum = (
+        select(Adjustment.member_id, func.sum(Adjustment.amount).label("amount"))
+        .group_by(Adjustment.member_id)
+        .subquery()
+    )
+    total_deposits = func.coalesce(deposits_sum.c.amount, 0)
+    total_expenses = func.coalesce(expenses_sum.c.amount, 0)
+    total_adjustments = func.coalesce(adjustments_sum.c.amount, 0)
+
+    source = (
+        select(
+            SteamUser.id,
+            total_deposits,
+            total_expenses,
+            total_adjustments,
+            total_deposits - total_expenses + total_adjustments,
+            func.now()
+        )
+        .outerjoin(deposits_sum, deposits_sum.c.member_id == SteamUser.id)
+        .outerjoin(expenses_sum, expenses_sum.c.member_id == SteamUser.id)
+        .outerjoin(adjustments_sum, adjustments_sum.c.member_id == SteamUser.id)
+    )
+
+    stmt = insert(Balance).from_select(
+        ["member_id", "total_deposits", "total_expenses", "total_adjustments", "current_balance", "last_updated"],
+        source
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Balance.member_id],
+        set_={
+            "total_deposits": stmt.excluded.total_deposits,
+            "total_expenses": stmt.excluded.total_expenses,
+            "total_adjustments": stmt.excluded.total_adjustments,
+            "current_balance": stmt.excluded.current_balance,
+            "last_updated": stmt.excluded.last_updated
+        }
+    )
+    result = await db.execute(stmt)
+    return result.rowcount
@@ -1,16 +1,25 @@
 import os
-import cloudinary
-import cloudinary.uploader
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
-cloudinary.config(
-    cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
-    api_key=os.getenv("CLOUDINARY_API_KEY"),
-    api_secret=os.getenv("CLOUDINARY_API_SECRET"),
-    secure=True
-)
+# Timeout (segundos) de cada petición HTTP a Cloudinary
+CLOUDINARY_TIMEOUT_SECONDS = int(os.getenv("CLOUDINARY_TIMEOUT_SECONDS", "20"))
+
+@lru_cache(maxsize=None)
+def get_uploader():
+    """Importa y configura el SDK de Cloudinary en el primer uso, no al arrancar la app."""
+    import cloudinary
+    import cloudinary.uploader
+
+    cloudinary.config(
+        cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
+        api_key=os.getenv("CLOUDINARY_API_KEY"),
+        api_secret=os.getenv("CLOUDINARY_API_SECRET"),
+        secure=True
+    )
+    return cloudinary.uploader
 
 def upload_profile_image(file_bytes: bytes, user_id: int, filename: str) -> dict:
     import logging
@@ -20,7 +29,7 @@ def upload_profile_image(file_bytes: bytes, user_id: int, filename: str) -> dict
         logger.info(log_msg)
         print(log_msg)
         import uuid
-        result = cloudinary.uploader.upload(
+        result = get_uploader().upload(
             file_bytes,
             folder="steam_group/profiles",
             public_id=f"user_{user_id}_{uuid.uuid4()}",
@@ -28,6 +37,7 @@ def upload_profile_image(file_bytes: bytes, user_id: int, filename: str) -> dict
             overwrite=False,
             invalidate=True,
             resource_type="image",
+            timeout=CLOUDINARY_TIMEOUT_SECONDS,
             transformation=[
                 {
                     "width": 500,
@@ -76,7 +86,7 @@ def upload_profile_image(file_bytes: bytes, user_id: int, filename: str) -> dict
 
 def delete_profile_image(public_id: str) -> bool:
     try:
-        result = cloudinary.uploader.destroy(public_id, invalidate=True)
+        result = get_uploader().destroy(public_id, invalidate=True, timeout=CLOUDINARY_TIMEOUT_SECONDS)
         return result.get("result") == "ok"
     except Exception as e:
         raise Exception(f"Error al eliminar imagen de Cloudinary: {str(e)}")
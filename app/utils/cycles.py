@@ -0,0 +1,34 @@
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import ProposalCycle
+
+# Cada mes con propuestas tiene un número de ciclo correlativo. El número se asigna en la
+# tabla proposal_cycles con un único upsert: el primer INSERT del mes toma MAX + 1 y los
+# siguientes (o los concurrentes, que esperan el lock de la fila) reciben el ya asignado.
+MAX_ATTEMPTS = 3
+
+
+async def allocate_proposal_number(db: AsyncSession, month_year: int) -> int:
+    """Devuelve el número de ciclo de `month_year`, asignándolo si es el primero del mes.
+
+    Llamar antes de cualquier otra escritura de la transacción: si dos meses nuevos toman el
+    mismo número a la vez, el perdedor hace rollback y reintenta con el máximo actualizado.
+    """
+    next_number = select(literal(month_year), func.coalesce(func.max(ProposalCycle.proposal_number), 0) + 1)
+    stmt = insert(ProposalCycle).from_select(["month_year", "proposal_number"], next_number)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ProposalCycle.month_year],
+        # Actualización sin cambios para que RETURNING devuelva la fila existente
+        set_={"month_year": stmt.excluded.month_year}
+    ).returning(ProposalCycle.proposal_number)
+
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return await db.scalar(stmt)
+        except IntegrityError:
+            await db.rollback()
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
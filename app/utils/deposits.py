@@ -0,0 +1,89 @@
+import csv
+import io
+from datetime import datetime
+from typing import Any, Dict, List
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Deposit
+from app.schemas import schemas
+from app.utils.balances import apply_balance_deltas
+
+# Carga masiva de depósitos: valida todas las filas antes de escribir y las inserta con un
+# único INSERT multi-fila, así importar un extracto completo es una sola transacción.
+MAX_BULK_DEPOSITS = 1000
+CSV_COLUMNS = ("member_id", "amount", "note", "date")
+
+
+def read_deposit_csv(content: bytes) -> List[Dict[str, Any]]:
+    """Convierte un CSV con cabecera (member_id, amount y opcionalmente note, date) en filas.
+
+    Acepta coma o punto y coma como separador; las celdas vacías se toman como ausentes.
+    """
+    text = content.decode("utf-8-sig")
+    try:
+        dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(text), dialect=dialect)
+    missing = {"member_id", "amount"} - {name.strip() for name in reader.fieldnames or []}
+    if missing:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(sorted(missing))}")
+    rows = []
+    for row in reader:
+        values = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+        values = {key: value for key, value in values.items() if key in CSV_COLUMNS}
+        # Los extractos suelen traer solo la fecha
+        if len(values.get("date", "")) == 10:
+            values["date"] += "T00:00:00"
+        rows.append(values)
+    return rows
+
+
+def validate_deposit_rows(rows: List[Any]):
+    """Valida cada fila contra DepositCreate.
+
+    Devuelve (depósitos válidos como (fila, depósito), errores), donde cada error es
+    {"row", "error"}; las filas se numeran desde 1.
+    """
+    deposits, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        try:
+            deposits.append((number, schemas.DepositCreate.model_validate(row)))
+        except ValidationError as exc:
+            message = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'fila'}: {error['msg']}"
+                for error in exc.errors()
+            )
+            errors.append({"row": number, "error": message})
+    return deposits, errors
+
+
+async def insert_deposits(db: AsyncSession, deposits: List[schemas.DepositCreate]) -> List[Dict[str, Any]]:
+    """Inserta los depósitos con INSERT ... RETURNING multi-fila y suma los montos a `balance`.
+
+    No valida los miembros ni hace commit. Devuelve las filas insertadas en el mismo orden.
+    """
+    if not deposits:
+        return []
+    now = datetime.utcnow()
+    rows = [{
+        "member_id": deposit.member_id,
+        "amount": int(deposit.amount),
+        "note": deposit.note,
+        "date": deposit.date or now,
+        "created_at": now
+    } for deposit in deposits]
+    table = Deposit.__table__
+    # executemany con RETURNING: SQLAlchemy lo agrupa en INSERT multi-fila ("insertmanyvalues")
+    # y devuelve las filas en el orden de los parámetros
+    result = await db.execute(insert(table).returning(*table.c, sort_by_parameter_order=True), rows)
+    inserted = [dict(row) for row in result.mappings()]
+
+    totals: Dict[int, int] = {}
+    for row in inserted:
+        totals[row["member_id"]] = totals.get(row["member_id"], 0) + row["amount"]
+    await apply_balance_deltas(db, deposits=totals)
+    return inserted
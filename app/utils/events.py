@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set
+
+# Difusión en proceso de eventos de votación hacia los clientes SSE: cada escritura publica un
+# evento una sola vez y el broadcaster lo reparte a todas las conexiones abiertas.
+# Igual que las versiones de ETag, supone un único proceso de uvicorn.
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_REPLAY_SIZE = 200
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    name: str
+    data: Dict[str, Any]
+
+    def encode(self) -> str:
+        payload = json.dumps(self.data, default=str, ensure_ascii=False)
+        return f"id: {self.id}\nevent: {self.name}\ndata: {payload}\n\n"
+
+
+class Broadcaster:
+    """Reparte eventos a suscriptores con colas acotadas.
+
+    Un cliente lento no frena a los demás: si su cola se llena se vacía y recibe un evento
+    `resync` para que vuelva a pedir el estado completo.
+    """
+
+    def __init__(self, queue_size: int = SSE_QUEUE_SIZE, replay_size: int = SSE_REPLAY_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._recent: Deque[Event] = deque(maxlen=replay_size)
+        self._last_id = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, name: str, data: Dict[str, Any]) -> Event:
+        self._last_id += 1
+        event = Event(self._last_id, name, data)
+        self._recent.append(event)
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(Event(event.id, "resync", {}))
+        return event
+
+    def _missed(self, last_event_id: int):
+        return [event for event in self._recent if event.id > last_event_id]
+
+    def can_resume(self, last_event_id: int) -> bool:
+        """True si una reconexión desde `last_event_id` se completa reenviando lo perdido."""
+        if last_event_id == self._last_id:
+            return True
+        # Lo perdido tiene que seguir entero en el buffer (un id mayor viene de antes de un reinicio)
+        missed = self._missed(last_event_id)
+        return bool(missed) and missed[0].id == last_event_id + 1 and len(missed) < self.queue_size
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if last_event_id is not None and last_event_id != self._last_id:
+            # Reconexión: se reenvía lo perdido si todavía está en el buffer
+            if self.can_resume(last_event_id):
+                for event in self._missed(last_event_id):
+                    queue.put_nowait(event)
+            else:
+                queue.put_nowait(Event(self._last_id, "resync", {}))
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def stream(self, queue: asyncio.Queue, is_disconnected, initial: Optional[Event] = None) -> AsyncIterator[str]:
+        """Genera el cuerpo text/event-stream hasta que el cliente se desconecta."""
+        try:
+            yield "retry: 3000\n\n"
+            if initial is not None:
+                yield initial.encode()
+            while not await is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+                    continue
+                yield event.encode()
+        finally:
+            self.unsubscribe(queue)
+
+
+vote_events = Broadcaster()
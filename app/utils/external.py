@@ -0,0 +1,81 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from threading import Lock
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+
+# Los SDK de Supabase y Cloudinary son síncronos: se ejecutan en un pool acotado de hilos
+# para que una subida lenta no detenga el event loop. Cada SDK reutiliza su propio cliente
+# HTTP con keep-alive (httpx en Supabase, urllib3 en Cloudinary).
+EXTERNAL_MAX_WORKERS = int(os.getenv("EXTERNAL_MAX_WORKERS", "8"))
+EXTERNAL_TIMEOUT_SECONDS = float(os.getenv("EXTERNAL_TIMEOUT_SECONDS", "20"))
+
+logger = logging.getLogger("external_calls")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=EXTERNAL_MAX_WORKERS, thread_name_prefix="external")
+    return _executor
+
+
+@dataclass
+class CallStats:
+    count: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+
+external_call_stats: Dict[str, CallStats] = {}
+_stats_lock = Lock()
+
+
+def _record(name: str, elapsed: float, error: bool = False, timeout: bool = False):
+    with _stats_lock:
+        stats = external_call_stats.setdefault(name, CallStats())
+        stats.count += 1
+        stats.errors += int(error)
+        stats.timeouts += int(timeout)
+        stats.total_seconds += elapsed
+        stats.max_seconds = max(stats.max_seconds, elapsed)
+    logger.info(f"{name} tardó {elapsed * 1000:.0f} ms" + (" (error)" if error else ""))
+
+
+async def run_external(name: str, func, *args, timeout: float = EXTERNAL_TIMEOUT_SECONDS, **kwargs):
+    """Ejecuta una llamada bloqueante a un servicio externo en el pool, con timeout y registro de latencia."""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(
+            loop.run_in_executor(_get_executor(), partial(func, *args, **kwargs)),
+            timeout
+        )
+    except asyncio.TimeoutError:
+        _record(name, time.perf_counter() - start, error=True, timeout=True)
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail=f"El servicio externo no respondió a tiempo ({name})"
+        )
+    except Exception:
+        _record(name, time.perf_counter() - start, error=True)
+        raise
+    _record(name, time.perf_counter() - start)
+    return result
+
+
+def shutdown_external_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
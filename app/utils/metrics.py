@@ -0,0 +1,216 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from app.utils.audit import audit_log
+from app.utils.external import external_call_stats
+
+# Métricas en memoria en formato de texto de Prometheus, sin dependencias: un middleware ASGI
+# registra cada petición bajo la plantilla de su ruta ("/proposals/{proposal_id}/vote", no la
+# URL concreta) y los eventos del engine cuentan las consultas y su tiempo en la petición que
+# las ejecutó. Los valores son del proceso y se reinician con él.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+UNMATCHED_ROUTE = "unmatched"
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.series: Dict[Labels, List[float]] = {}
+
+    def observe(self, labels: Labels, value: float):
+        # Por serie: un contador por bucket (no acumulado), luego suma y cantidad
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+
+@dataclass
+class QueryStats:
+    queries: int = 0
+    seconds: float = 0.0
+
+
+_lock = Lock()
+_requests: Dict[Labels, int] = {}
+_in_progress = 0
+_durations = Histogram(LATENCY_BUCKETS)
+_sizes = Histogram(SIZE_BUCKETS)
+_request_queries = Histogram(QUERY_BUCKETS)
+_request_db_seconds = Histogram(LATENCY_BUCKETS)
+_db_totals = QueryStats()
+
+# Consultas de la petición en curso; None fuera de una petición (p. ej. el escritor de auditoría)
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+_route_templates: Dict[int, Dict[object, str]] = {}
+
+
+def _route_label(scope) -> str:
+    # El router deja en scope["endpoint"] la función (o la app montada) que atendió la ruta
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return UNMATCHED_ROUTE
+    templates = _route_templates.get(id(app))
+    if templates is None:
+        templates = _route_templates[id(app)] = {
+            getattr(route, "endpoint", None) or getattr(route, "app", None): getattr(route, "path_format", getattr(route, "path", ""))
+            for route in app.routes
+        }
+    return templates.get(endpoint, UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        global _in_progress
+        response = {"status": 500, "bytes": 0}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response["bytes"] += len(message.get("body", b""))
+            await send(message)
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+        with _lock:
+            _in_progress += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            labels = (("method", scope["method"]), ("route", _route_label(scope)))
+            with _lock:
+                _in_progress -= 1
+                key = labels + (("status", str(response["status"])),)
+                _requests[key] = _requests.get(key, 0) + 1
+                _durations.observe(labels, elapsed)
+                _sizes.observe(labels, response["bytes"])
+                _request_queries.observe(labels, stats.queries)
+                _request_db_seconds.observe(labels, stats.seconds)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    request = _request_stats.get()
+    with _lock:
+        _db_totals.queries += 1
+        _db_totals.seconds += elapsed
+    if request is not None:
+        request.queries += 1
+        request.seconds += elapsed
+
+
+def instrument_engine(engine):
+    """Registra los eventos que miden las consultas de `engine` (el sync_engine si es async)."""
+    engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _header(lines: List[str], name: str, kind: str, help_text: str):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+
+
+def _render_samples(lines: List[str], name: str, kind: str, help_text: str, samples: Dict[Labels, float]):
+    _header(lines, name, kind, help_text)
+    for labels, value in sorted(samples.items()):
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+
+def _render_histogram(lines: List[str], name: str, help_text: str, histogram: Histogram):
+    _header(lines, name, "histogram", help_text)
+    for labels, series in sorted(histogram.series.items()):
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, series):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', _format_value(float(bound))),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {series[-1]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(float(series[-2]))}")
+        lines.append(f"{name}_count{_format_labels(labels)} {series[-1]}")
+
+
+def render_metrics() -> str:
+    lines: List[str] = []
+    with _lock:
+        _render_samples(lines, "http_requests_total", "counter",
+                        "Peticiones HTTP por método, ruta y código de estado.", _requests)
+        _render_samples(lines, "http_requests_in_progress", "gauge",
+                        "Peticiones HTTP en curso (incluye streams abiertos).", {(): _in_progress})
+        _render_histogram(lines, "http_request_duration_seconds",
+                          "Duración de las peticiones HTTP por ruta.", _durations)
+        _render_histogram(lines, "http_response_size_bytes",
+                          "Tamaño del cuerpo de las respuestas por ruta.", _sizes)
+        _render_histogram(lines, "http_request_db_queries",
+                          "Consultas SQL ejecutadas por petición.", _request_queries)
+        _render_histogram(lines, "http_request_db_seconds",
+                          "Tiempo en consultas SQL por petición.", _request_db_seconds)
+        _render_samples(lines, "db_queries_total", "counter",
+                        "Consultas SQL ejecutadas, dentro o fuera de una petición.", {(): _db_totals.queries})
+        _render_samples(lines, "db_query_seconds_total", "counter",
+                        "Tiempo total en consultas SQL.", {(): _db_totals.seconds})
+
+    external = {(("name", name),): stats for name, stats in list(external_call_stats.items())}
+    _render_samples(lines, "external_calls_total", "counter", "Llamadas a servicios externos.",
+                    {labels: stats.count for labels, stats in external.items()})
+    _render_samples(lines, "external_call_errors_total", "counter", "Llamadas externas con error.",
+                    {labels: stats.errors for labels, stats in external.items()})
+    _render_samples(lines, "external_call_timeouts_total", "counter", "Llamadas externas que excedieron el timeout.",
+                    {labels: stats.timeouts for labels, stats in external.items()})
+    _render_samples(lines, "external_call_seconds_total", "counter", "Tiempo total en llamadas externas.",
+                    {labels: stats.total_seconds for labels, stats in external.items()})
+    _render_samples(lines, "external_call_max_seconds", "gauge", "Llamada externa más lenta.",
+                    {labels: stats.max_seconds for labels, stats in external.items()})
+
+    _render_samples(lines, "audit_events_total", "counter", "Eventos de auditoría por resultado.",
+                    {(("result", result),): count for result, count in audit_log.stats.items()})
+    _render_samples(lines, "audit_queue_pending", "gauge", "Eventos de auditoría esperando escritura.",
+                    {(): audit_log.pending})
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,64 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
+
+
+async def fetch_page(
+    db: AsyncSession,
+    stmt,
+    sort_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int,
+    mappings: bool = False
+) -> dict:
+    """Pagina `stmt` por keyset sobre (sort_column, id_column) en orden descendente.
+
+    El cursor es la última fila de la página anterior, así cada página cuesta lo mismo
+    sin importar cuántas filas haya detrás (a diferencia de OFFSET).
+    Con `mappings=True` `stmt` selecciona columnas y los items son dicts en lugar de objetos ORM.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(sort_column, id_column) < tuple_(sort_value, row_id))
+
+    stmt = stmt.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1)
+    result = await db.execute(stmt)
+    rows = [dict(row) for row in result.mappings()] if mappings else result.scalars().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if mappings:
+            next_cursor = encode_cursor(last[sort_column.key], last[id_column.key])
+        else:
+            next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return {"items": rows, "next_cursor": next_cursor}
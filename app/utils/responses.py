@@ -0,0 +1,38 @@
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+# Camino rápido para listados: devolver un Response ya serializado evita que FastAPI vuelva a
+# validar el contenido contra response_model y lo pase por jsonable_encoder + json.dumps.
+# El formato es el mismo que produce Pydantic (datetimes UTC con "Z", Decimal como string).
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError
+
+
+def _headers(response: Optional[Response]) -> Optional[dict]:
+    # Cabeceras que las dependencias dejaron en el Response inyectado (por ejemplo el ETag)
+    return dict(response.headers) if response is not None else None
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(content: Any, response: Optional[Response] = None) -> Response:
+    """Serializa dicts/listas de tipos básicos directamente con orjson."""
+    return FastJSONResponse(content, headers=_headers(response))
+
+
+def model_response(adapter: TypeAdapter, content: Any, response: Optional[Response] = None) -> Response:
+    """Valida `content` (dicts o filas) con un TypeAdapter precompilado y lo serializa a bytes en pydantic-core."""
+    body = adapter.dump_json(adapter.validate_python(content))
+    return Response(body, media_type="application/json", headers=_headers(response))
@@ -0,0 +1,77 @@
+import logging
+from datetime import datetime
+from typing import Any, Iterable, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models.models import Setting
+from app.schemas import schemas
+
+logger = logging.getLogger(__name__)
+
+# Configuración del grupo en memoria: se lee de la tabla `settings` al arrancar y los routers
+# la consultan en cada petición sin tocar la base. PUT /settings escribe en la tabla y, tras
+# el commit, reemplaza la copia en memoria. Como las versiones de ETag, supone un único
+# proceso; un cambio hecho con SQL directo se aplica con POST /settings/reload.
+
+
+def parse_settings(rows: Iterable[Tuple[str, Any]]) -> schemas.AppSettings:
+    """Arma la configuración desde filas (key, value). Las claves desconocidas se ignoran y
+    un valor inválido deja el valor por defecto de ese campo."""
+    values = {}
+    for key, value in rows:
+        if key not in schemas.AppSettings.model_fields:
+            continue
+        try:
+            schemas.AppSettings.model_validate({key: value})
+        except ValidationError:
+            logger.warning("Valor inválido para la configuración %s: %r, se usa el valor por defecto", key, value)
+            continue
+        values[key] = value
+    return schemas.AppSettings.model_validate(values)
+
+
+class SettingsStore:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._current = schemas.AppSettings()
+        self.loaded_at: Optional[datetime] = None
+
+    @property
+    def current(self) -> schemas.AppSettings:
+        return self._current
+
+    async def load(self) -> schemas.AppSettings:
+        """Relee la tabla `settings` completa y reemplaza la copia en memoria."""
+        async with self._session_factory() as db:
+            rows = (await db.execute(select(Setting.key, Setting.value))).all()
+        self.replace(parse_settings(rows))
+        return self._current
+
+    def replace(self, new_settings: schemas.AppSettings):
+        self._current = new_settings
+        self.loaded_at = datetime.utcnow()
+
+    async def write(self, db: AsyncSession, changes: schemas.AppSettingsUpdate) -> schemas.AppSettings:
+        """Guarda los campos enviados en `changes` (sin commit) y devuelve la configuración
+        resultante. Llamar a replace() con ella después del commit."""
+        fields = changes.model_dump(exclude_none=True)
+        merged = self._current.model_copy(update=fields)
+        if fields:
+            now = datetime.utcnow()
+            stmt = insert(Setting.__table__).values([
+                {"key": key, "value": value, "updated_at": now}
+                for key, value in merged.model_dump(mode="json", include=set(fields)).items()
+            ])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[Setting.__table__.c.key],
+                set_={"value": stmt.excluded.value, "updated_at": stmt.excluded.updated_at}
+            ))
+        return merged
+
+
+app_settings = SettingsStore()
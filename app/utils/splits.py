@@ -0,0 +1,82 @@
+from dataclasses import dataclass
+from fractions import Fraction
+from typing import List, Sequence, Union
+
+# Regla histórica del grupo: el propietario paga el 40% y el resto se reparte en partes iguales
+DEFAULT_OWNER_RATIO = Fraction(2, 5)
+
+
+@dataclass(frozen=True)
+class Split:
+    total: int
+    participants: int
+    owner_share: int
+    participant_share: int
+    owner_ratio: Fraction
+
+    @property
+    def participants_total(self) -> int:
+        return self.participant_share * self.participants
+
+    @property
+    def owner_percent(self) -> str:
+        return format_percent(self.owner_ratio)
+
+    @property
+    def participant_percent(self) -> str:
+        if not self.participants:
+            return "0"
+        return format_percent((1 - self.owner_ratio) / self.participants)
+
+
+def format_percent(ratio: Fraction) -> str:
+    return f"{float(ratio * 100):.1f}".rstrip("0").rstrip(".")
+
+
+def _as_ratio(owner_ratio: Union[Fraction, float, str]) -> Fraction:
+    ratio = Fraction(owner_ratio).limit_denominator(10000) if isinstance(owner_ratio, float) else Fraction(owner_ratio)
+    if not 0 <= ratio <= 1:
+        raise ValueError(f"owner_ratio debe estar entre 0 y 1, recibido {owner_ratio}")
+    return ratio
+
+
+def compute_splits(
+    totals: Sequence[int],
+    participants: Union[int, Sequence[int]],
+    owner_ratio: Union[Fraction, float, str] = DEFAULT_OWNER_RATIO
+) -> List[Split]:
+    """Reparte varios precios de una vez con aritmética entera exacta.
+
+    Cada participante paga `floor((total - floor(total * ratio)) / n)` y el propietario
+    absorbe el resto, así la suma de las partes es siempre igual al total.
+    `participants` puede ser un entero común o una secuencia paralela a `totals`.
+    """
+    ratio = _as_ratio(owner_ratio)
+    numerator, denominator = ratio.numerator, ratio.denominator
+    counts = [participants] * len(totals) if isinstance(participants, int) else list(participants)
+    if len(counts) != len(totals):
+        raise ValueError("totals y participants deben tener la misma longitud")
+
+    splits = []
+    for total, count in zip(totals, counts):
+        total = int(total)
+        if total < 0 or count < 0:
+            raise ValueError("El total y el número de participantes no pueden ser negativos")
+        owner_base = total * numerator // denominator
+        participant_share = (total - owner_base) // count if count else 0
+        splits.append(Split(
+            total=total,
+            participants=count,
+            owner_share=total - participant_share * count,
+            participant_share=participant_share,
+            owner_ratio=ratio
+        ))
+    return splits
+
+
+def compute_split(
+    total: int,
+    participants: int,
+    owner_ratio: Union[Fraction, float, str] = DEFAULT_OWNER_RATIO
+) -> Split:
+    return compute_splits([total], participants, owner_ratio)[0]
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal
+from app.models.models import ProposalsTurn
+
+# Estado del turno de propuestas en memoria: GET /proposals/turn-status lo consultan todos los
+# clientes por polling y se responde sin abrir una sesión. Se lee de la base una sola vez y
+# luego solo cambia con toggle(), que escribe primero en la tabla. Como las versiones de ETag,
+# supone un único proceso.
+
+
+class TurnState:
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self._session_factory = session_factory
+        self._status: Optional[bool] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Optional[bool]:
+        """Estado actual del turno, o None si la tabla está vacía."""
+        if not self._loaded:
+            async with self._session_factory() as db:
+                self._status = await db.scalar(
+                    select(ProposalsTurn.status).order_by(ProposalsTurn.id).limit(1)
+                )
+            self._loaded = True
+        return self._status
+
+    async def toggle(self, db: AsyncSession) -> bool:
+        """Invierte el turno en la base con un UPDATE atómico (o crea el registro activo si no
+        existe), hace commit y actualiza la copia en memoria."""
+        table = ProposalsTurn.__table__
+        # El lock mantiene el orden de los commits y de la copia en memoria entre toggles
+        # concurrentes de este proceso; entre transacciones lo ordena el lock de la fila
+        async with self._lock:
+            first_id = select(func.min(table.c.id)).scalar_subquery()
+            status = await db.scalar(
+                update(table).where(table.c.id == first_id).values(status=~table.c.status).returning(table.c.status)
+            )
+            if status is None:
+                status = await db.scalar(insert(table).values(status=True).returning(table.c.status))
+            await db.commit()
+            self._status, self._loaded = status, True
+        return status
+
+
+proposals_turn = TurnState()
@@ -0,0 +1,87 @@
+import hashlib
+import math
+import time
+import uuid
+from email.utils import formatdate, parsedate_to_datetime
+from threading import Lock
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, Request, Response, status
+
+# Versión en memoria de cada recurso: los endpoints de escritura la incrementan después del
+# commit y los GET de listados la usan como ETag, así un poll sin cambios se responde con 304
+# sin consultar la base de datos.
+#
+# Supone un único proceso (uvicorn sin --workers, como en render.yaml): con varios workers
+# una escritura solo incrementa la versión del proceso que la atendió y los demás seguirían
+# respondiendo 304 con datos viejos. Escrituras hechas fuera de la API (SQL directo, scripts)
+# tampoco cambian la versión hasta reiniciar.
+RESOURCES = ("proposals", "turn", "balances", "purchases", "deposits", "users", "collections", "adjustments", "settings")
+
+# Cambia en cada arranque: un ETag emitido antes de un reinicio nunca coincide después
+_BOOT_ID = uuid.uuid4().hex[:8]
+
+# Las fechas se guardan en segundos enteros (la resolución de Last-Modified) y cada bump
+# avanza al menos un segundo: así el Last-Modified que el cliente reenvía en
+# If-Modified-Since es exactamente el guardado, y un cambio en ese mismo segundo no se
+# confunde con él
+_lock = Lock()
+_versions: Dict[str, Tuple[int, int]] = {name: (0, math.ceil(time.time())) for name in RESOURCES}
+
+
+def bump(*resources: str):
+    """Marca los recursos como modificados. Llamar después del commit."""
+    now = math.ceil(time.time())
+    with _lock:
+        for name in resources:
+            version, modified = _versions[name]
+            _versions[name] = (version + 1, max(now, modified + 1))
+
+
+def _validators(resources: Tuple[str, ...], url: str) -> Tuple[str, int]:
+    with _lock:
+        state = [(name, *_versions[name]) for name in resources]
+    tag = ".".join(f"{version}" for _, version, _ in state)
+    # La ruta y la página (cursor, limit, filtros) forman parte de la representación
+    url_hash = hashlib.blake2b(url.encode(), digest_size=6).hexdigest()
+    last_modified = max(modified for _, _, modified in state)
+    return f'W/"{_BOOT_ID}-{tag}-{url_hash}"', last_modified
+
+
+def _not_modified(request: Request, etag: str, last_modified: int) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = {candidate.strip() for candidate in if_none_match.split(",")}
+        return "*" in candidates or etag in candidates or etag[2:] in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return last_modified <= since
+    return False
+
+
+def conditional(*resources: str):
+    """Dependencia para GETs cuyo contenido solo depende de `resources`.
+
+    Pone ETag/Last-Modified en la respuesta y corta con 304 si el cliente ya tiene la versión
+    actual. Declararla después de la dependencia de autenticación.
+    """
+    for name in resources:
+        if name not in _versions:
+            raise ValueError(f"Recurso desconocido: {name}")
+
+    async def dependency(request: Request, response: Response):
+        etag, last_modified = _validators(resources, f"{request.url.path}?{request.url.query}")
+        headers = {
+            "ETag": etag,
+            "Last-Modified": formatdate(last_modified, usegmt=True),
+            "Cache-Control": "private, no-cache"
+        }
+        if _not_modified(request, etag, last_modified):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import BigInteger, Row, String, case, delete, func, literal, select, true, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import GameProposal, Vote
+
+# Contador desnormalizado: `game_proposals.votes_count` se ajusta en la misma transacción que
+# inserta, borra o mueve el voto, así leer los votos de una propuesta es leer una columna.
+#
+# La regla "un voto por miembro en la ronda en curso" la impone el índice único parcial
+# uq_votes_active_member: votar o cambiar el voto es un upsert sobre esa fila, después de
+# bloquearla.
+
+
+async def apply_vote_deltas(db: AsyncSession, deltas: Dict[int, int]) -> Dict[int, int]:
+    """Suma `deltas` (proposal_id -> +1/-1) a `votes_count` con un único UPDATE y devuelve
+    el contador resultante de cada propuesta.
+
+    No hace commit: debe llamarse dentro de la transacción que registra el voto.
+    """
+    deltas = {proposal_id: delta for proposal_id, delta in deltas.items() if delta}
+    if not deltas:
+        return {}
+    result = await db.execute(
+        update(GameProposal)
+        .where(GameProposal.id.in_(deltas))
+        .values(votes_count=GameProposal.votes_count + case(deltas, value=GameProposal.id, else_=0))
+        .returning(GameProposal.id, GameProposal.votes_count)
+        .execution_options(synchronize_session="fetch")
+    )
+    return dict(result.all())
+
+
+async def upsert_vote(db: AsyncSession, proposal_id: int, member_id: int) -> Optional[Row]:
+    """Registra el voto activo del miembro en `proposal_id`, moviéndolo si ya tenía uno.
+
+    Devuelve (voted_at, previous_proposal_id, previous_title), con previous_* en None si es
+    un voto nuevo, o None si no se registró nada: la propuesta ya no está en votación, el
+    voto activo ya era para ella o un voto concurrente del mismo miembro llegó primero.
+    No hace commit ni ajusta `votes_count`.
+    """
+    # El voto activo se bloquea antes del upsert: otra petición del mismo miembro espera
+    # hasta el commit y después lee el voto ya movido, no el que había al empezar
+    # (sin JOIN: tras la espera Postgres revalida la fila nueva contra la propuesta vieja y
+    # la descartaría; el título va en una subconsulta que se evalúa sobre la fila nueva)
+    title = select(GameProposal.title).where(GameProposal.id == Vote.proposal_id).scalar_subquery()
+    previous = (await db.execute(
+        select(Vote.proposal_id, title)
+        .where(Vote.member_id == member_id, Vote.active)
+        .with_for_update()
+    )).first()
+    previous_id, previous_title = previous if previous else (None, None)
+    if previous_id == proposal_id:
+        return None
+
+    source = select(
+        GameProposal.id, literal(member_id), true(), true(), literal(datetime.utcnow())
+    ).where(GameProposal.id == proposal_id, GameProposal.status == 'proposed')
+    stmt = insert(Vote).from_select(["proposal_id", "member_id", "vote", "active", "voted_at"], source)
+    if previous_id is None:
+        # Sin voto previo no hay fila que bloquear: si otro voto del miembro se insertó
+        # entre medio, este no se registra
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Vote.member_id], index_where=Vote.active)
+    else:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Vote.member_id],
+            index_where=Vote.active,
+            set_={"proposal_id": stmt.excluded.proposal_id, "voted_at": stmt.excluded.voted_at},
+            where=Vote.proposal_id == previous_id
+        )
+    stmt = stmt.returning(
+        Vote.voted_at,
+        literal(previous_id, BigInteger).label("previous_proposal_id"),
+        literal(previous_title, String).label("previous_title")
+    )
+    return (await db.execute(stmt)).first()
+
+
+async def delete_active_vote(db: AsyncSession, member_id: int) -> Optional[Row]:
+    """Borra el voto activo del miembro y devuelve (proposal_id, title), o None si no tenía."""
+    votes, proposals = Vote.__table__, GameProposal.__table__
+    return (await db.execute(
+        delete(votes)
+        .where(votes.c.member_id == member_id, votes.c.active, proposals.c.id == votes.c.proposal_id)
+        .returning(votes.c.proposal_id, proposals.c.title)
+    )).first()
+
+
+async def reconcile_vote_counts(db: AsyncSession, fix: bool = True) -> List[dict]:
+    """Compara `votes_count` con la tabla `votes` y devuelve las propuestas que no coinciden.
+
+    Con `fix` corrige esas filas (sin commit). El conteo real se recalcula en el propio
+    UPDATE, así un voto concurrente no deja el contador desfasado.
+    """
+    actual = (
+        select(Vote.proposal_id, func.count(Vote.id).label("votes"))
+        .group_by(Vote.proposal_id)
+        .subquery()
+    )
+    actual_votes = func.coalesce(actual.c.votes, 0)
+    rows = (await db.execute(
+        select(GameProposal.id, GameProposal.votes_count, actual_votes)
+        .outerjoin(actual, actual.c.proposal_id == GameProposal.id)
+        .where(GameProposal.votes_count != actual_votes)
+        .order_by(GameProposal.id)
+    )).all()
+    mismatches = [
+        {"proposal_id": proposal_id, "stored": stored, "actual": counted}
+        for proposal_id, stored, counted in rows
+    ]
+
+    if fix and mismatches:
+        await db.execute(
+            update(GameProposal)
+            .where(GameProposal.id.in_([m["proposal_id"] for m in mismatches]))
+            .values(votes_count=select(func.count(Vote.id)).where(Vote.proposal_id == GameProposal.id).scalar_subquery())
+            .execution_options(synchronize_session=False)
+        )
+    return mismatches
@@ -0,0 +1,210 @@
+"""
+Mide la latencia y el número de consultas SQL de los endpoints principales.
+
+Ejecutar (después de python -m benchmarks.seed --reset):
+    python -m benchmarks.run --iterations 100 --output report.json
+    python -m benchmarks.run --output nuevo.json --compare report.json
+
+Las peticiones van en proceso contra la app ASGI (httpx + ASGITransport), sin red ni
+uvicorn, de a una por vez: los números comparan versiones del código, no capacidad.
+Los tokens se firman localmente para los miembros que creó el seed.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+import httpx
+from sqlalchemy import event, func, select
+
+from app.database import AsyncSessionLocal, async_engine
+from app.models import SteamUser, Deposit, GameProposal, Vote, Purchase, PurchaseShare
+from app.utils.auth import create_access_token
+from benchmarks.seed import member_auth_uid
+from main import app
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class QueryCounter:
+    """Cuenta las sentencias que el motor envía a Postgres."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def percentile(sorted_values, pct):
+    # Nearest-rank: siempre devuelve una muestra observada
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies, queries, statuses):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "latency_ms": {
+            **{f"p{pct}": round(percentile(ordered, pct), 3) for pct in PERCENTILES},
+            "mean": round(sum(ordered) / len(ordered), 3),
+            "max": round(ordered[-1], 3)
+        },
+        "queries_per_request": {
+            "mean": round(sum(queries) / len(queries), 2),
+            "max": max(queries)
+        },
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())}
+    }
+
+
+def auth_headers(member_id: int) -> dict:
+    token = create_access_token({"sub": str(member_auth_uid(member_id))})
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def dataset_info():
+    async with AsyncSessionLocal() as db:
+        counts = {
+            model.__tablename__: await db.scalar(select(func.count()).select_from(model))
+            for model in (SteamUser, Deposit, GameProposal, Vote, Purchase, PurchaseShare)
+        }
+        open_proposals = (await db.execute(
+            select(GameProposal.id, GameProposal.proposer_id).where(GameProposal.status == 'proposed')
+        )).all()
+        member_ids = (await db.scalars(select(SteamUser.id).where(SteamUser.active == True).order_by(SteamUser.id))).all()
+    return counts, open_proposals, member_ids
+
+
+def build_scenarios(open_proposals, member_ids):
+    """(nombre, función que recibe la iteración y devuelve los argumentos de la petición)."""
+    master = auth_headers(member_ids[0])
+    proposers = {proposer_id for _, proposer_id in open_proposals}
+    voters = [member_id for member_id in member_ids if member_id not in proposers and member_id != member_ids[0]]
+    voter_headers = {member_id: auth_headers(member_id) for member_id in voters}
+    proposal_ids = [proposal_id for proposal_id, _ in open_proposals]
+
+    def vote(i):
+        # Cada iteración cambia el voto de un miembro a la siguiente propuesta abierta
+        member_id = voters[i % len(voters)]
+        proposal_id = proposal_ids[(i // len(voters)) % len(proposal_ids)]
+        return "POST", f"/proposals/{proposal_id}/vote", {"headers": voter_headers[member_id]}
+
+    def purchase(i):
+        return "POST", "/purchases/", {
+            "headers": master,
+            "params": {"owner_id": member_ids[i % len(member_ids)]},
+            "json": {"title": f"Benchmark {i}", "total_price": 30000}
+        }
+
+    scenarios = [
+        ("GET /deposits/balances/all", lambda i: ("GET", "/deposits/balances/all", {"headers": master})),
+        ("GET /auth/users", lambda i: ("GET", "/auth/users", {"headers": master})),
+        ("GET /proposals/", lambda i: ("GET", "/proposals/", {"headers": master})),
+        ("GET /deposits/", lambda i: ("GET", "/deposits/", {"headers": master})),
+        ("GET /purchases/", lambda i: ("GET", "/purchases/", {"headers": master})),
+        ("POST /purchases/", purchase),
+    ]
+    if voters and proposal_ids:
+        scenarios.append(("POST /proposals/{id}/vote", vote))
+    return scenarios
+
+
+async def run_scenario(client, counter, request_args, iterations, warmup):
+    latencies, queries, statuses = [], [], Counter()
+    for i in range(warmup + iterations):
+        method, url, kwargs = request_args(i)
+        before = counter.count
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        elapsed = (time.perf_counter() - start) * 1000
+        if i < warmup:
+            continue
+        latencies.append(elapsed)
+        queries.append(counter.count - before)
+        statuses[response.status_code] += 1
+    return summarize(latencies, queries, statuses)
+
+
+async def run(args):
+    counter = QueryCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        counts, open_proposals, member_ids = await dataset_info()
+        if not member_ids:
+            raise SystemExit("La base no tiene miembros: ejecutar antes python -m benchmarks.seed --reset")
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for name, request_args in build_scenarios(open_proposals, member_ids):
+                if args.only and not any(token in name for token in args.only):
+                    continue
+                results[name] = await run_scenario(client, counter, request_args, args.iterations, args.warmup)
+                latency = results[name]["latency_ms"]
+                print(f"{name:32} p50 {latency['p50']:8.2f} ms  p95 {latency['p95']:8.2f} ms  "
+                      f"{results[name]['queries_per_request']['mean']:5.1f} consultas")
+
+    event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+    return {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "dataset": counts
+        },
+        "results": results
+    }
+
+
+def compare(report, baseline):
+    print(f"\nComparación con {baseline['meta'].get('label') or 'baseline'}:")
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if not old:
+            continue
+        deltas = []
+        for key in ("p50", "p95"):
+            before, after = old["latency_ms"][key], result["latency_ms"][key]
+            change = (after - before) / before * 100 if before else 0.0
+            deltas.append(f"{key} {before:.2f} → {after:.2f} ms ({change:+.0f}%)")
+        query_delta = result["queries_per_request"]["mean"] - old["queries_per_request"]["mean"]
+        print(f"{name:32} {'  '.join(deltas)}  consultas {query_delta:+.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="correr solo los escenarios cuyo nombre contenga alguno de estos textos")
+    parser.add_argument("--label", default="", help="etiqueta de la versión medida (por ejemplo el commit)")
+    parser.add_argument("--output", help="ruta del reporte JSON")
+    parser.add_argument("--compare", help="reporte JSON anterior contra el que comparar")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nReporte guardado en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
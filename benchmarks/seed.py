@@ -0,0 +1,220 @@
+"""
+Carga datos sintéticos en una base LOCAL para los benchmarks.
+
+Ejecutar: python -m benchmarks.seed --reset --members 20 --years 3 --purchases 2000
+
+¡--reset borra y recrea el esquema public! Aun sin él se insertan miembros con ids fijos y
+se mueven las secuencias, así que el script se niega a correr si DATABASE_URL no apunta a
+localhost (o a un socket local); --force lo permite para otra base descartable.
+Los miembros quedan con auth_uid = UUID(int=id), así el runner puede firmar tokens
+sin pasar por Supabase; el miembro 1 es master.
+"""
+import argparse
+import asyncio
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from app.database import engine, AsyncSessionLocal, async_engine
+from app.models import Base, SteamUser, Deposit, GameProposal, Vote, Purchase, PurchaseShare
+from app.models.models import ProposalsTurn
+from app.utils.balances import rebuild_balances
+from app.utils.splits import compute_split
+
+BATCH_SIZE = 5000
+LOCAL_HOSTS = {None, "", "localhost", "127.0.0.1", "::1"}
+
+
+def member_auth_uid(member_id: int) -> uuid.UUID:
+    return uuid.UUID(int=member_id)
+
+
+def _insert(conn, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def build_rows(args, rng: random.Random):
+    now = datetime.utcnow()
+    start = now - timedelta(days=365 * args.years)
+    span = (now - start).total_seconds()
+
+    def random_date():
+        return start + timedelta(seconds=rng.uniform(0, span))
+
+    member_ids = list(range(1, args.members + 1))
+    users = [{
+        "id": member_id,
+        "name": f"bench{member_id}",
+        "role": "master" if member_id == 1 else "steam",
+        "auth_uid": member_auth_uid(member_id),
+        "active": True,
+        "created_at": start,
+        "updated_at": start
+    } for member_id in member_ids]
+
+    deposits = []
+    for member_id in member_ids:
+        for _ in range(args.years * 12 * args.deposits_per_month):
+            when = random_date()
+            deposits.append({
+                "member_id": member_id,
+                "amount": rng.choice([10000, 20000, 50000]),
+                "note": "bench",
+                "date": when,
+                "created_at": when
+            })
+
+    # Propuestas históricas ya cerradas, más una propuesta en votación por cada proposer de `open_proposers`
+    proposals = []
+    for proposal_id in range(1, args.proposals + 1):
+        when = random_date()
+        proposals.append({
+            "id": proposal_id,
+            "title": f"Juego {proposal_id}",
+            "proposer_id": rng.choice(member_ids),
+            "price": rng.randrange(20000, 300000, 1000),
+            "proposed_at": when,
+            "status": rng.choice(["purchased", "rejected", "rejected"]),
+            "proposal_number": None,
+            "month_year": int(when.strftime("%Y%m")),
+            "votes_count": 0
+        })
+    open_proposers = member_ids[1:1 + max(2, args.members // 4)]
+    month_year = int(now.strftime("%Y%m"))
+    for proposer_id in open_proposers:
+        proposals.append({
+            "id": len(proposals) + 1,
+            "title": f"Juego abierto {proposer_id}",
+            "proposer_id": proposer_id,
+            "price": rng.randrange(20000, 300000, 1000),
+            "proposed_at": now,
+            "status": "proposed",
+            "proposal_number": None,
+            "month_year": month_year,
+            "votes_count": 0
+        })
+
+    votes = []
+    for proposal in proposals:
+        if proposal["status"] == "proposed":
+            continue
+        voters = rng.sample(member_ids, k=rng.randint(1, len(member_ids)))
+        proposal["votes_count"] = len(voters)
+        for member_id in voters:
+            votes.append({
+                "proposal_id": proposal["id"],
+                "member_id": member_id,
+                "vote": True,
+                "active": False,
+                "voted_at": proposal["proposed_at"]
+            })
+
+    purchases = []
+    shares = []
+    for purchase_id in range(1, args.purchases + 1):
+        when = random_date()
+        owner_id = rng.choice(member_ids)
+        total = rng.randrange(20000, 300000, 1000)
+        purchases.append({
+            "id": purchase_id,
+            "proposal_id": None,
+            "title": f"Compra {purchase_id}",
+            "total_price": total,
+            "purchaser_id": 1,
+            "owner_id": owner_id,
+            "purchased_at": when,
+            "was_on_sale": False,
+            "original_price": None
+        })
+        participants = [member_id for member_id in member_ids if member_id != owner_id]
+        split = compute_split(total, len(participants))
+        for member_id in member_ids:
+            shares.append({
+                "purchase_id": purchase_id,
+                "member_id": member_id,
+                "share_amount": split.owner_share if member_id == owner_id else split.participant_share,
+                "paid": True,
+                "paid_at": when,
+                "created_at": when
+            })
+
+    # Saldo inicial que cubre el historial de compras, así los benchmarks de compra no fallan por saldo
+    expenses = {}
+    for share in shares:
+        expenses[share["member_id"]] = expenses.get(share["member_id"], 0) + share["share_amount"]
+    for member_id in member_ids:
+        deposits.append({
+            "member_id": member_id,
+            "amount": expenses.get(member_id, 0) + args.initial_balance,
+            "note": "bench: saldo inicial",
+            "date": start,
+            "created_at": start
+        })
+
+    return {
+        SteamUser: users,
+        Deposit: deposits,
+        GameProposal: proposals,
+        Vote: votes,
+        Purchase: purchases,
+        PurchaseShare: shares
+    }
+
+
+async def _rebuild():
+    async with AsyncSessionLocal() as db:
+        rows = await rebuild_balances(db)
+        await db.commit()
+    await async_engine.dispose()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reset", action="store_true", help="borrar y recrear el esquema antes de cargar")
+    parser.add_argument("--members", type=int, default=20)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--deposits-per-month", type=int, default=2)
+    parser.add_argument("--proposals", type=int, default=1000)
+    parser.add_argument("--purchases", type=int, default=2000)
+    parser.add_argument("--initial-balance", type=int, default=10_000_000, help="saldo disponible por miembro")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="correr aunque DATABASE_URL no sea local")
+    args = parser.parse_args()
+
+    if args.members < 3:
+        parser.error("--members debe ser al menos 3")
+    if engine.url.host not in LOCAL_HOSTS and not args.force:
+        parser.error(
+            f"DATABASE_URL apunta a {engine.url.host}, no a una base local. El seed escribe datos "
+            "sintéticos (y con --reset borra el esquema): usar --force solo si esa base es descartable"
+        )
+
+    if args.reset:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA public CASCADE; CREATE SCHEMA public;"))
+        Base.metadata.create_all(engine)
+
+    tables = build_rows(args, random.Random(args.seed))
+    with engine.begin() as conn:
+        for model, rows in tables.items():
+            _insert(conn, model, rows)
+            print(f"{model.__tablename__}: {len(rows)} filas")
+        conn.execute(insert(ProposalsTurn), [{"status": True}])
+        # Los ids se insertaron explícitos: avanzar las secuencias para los inserts de la app
+        for model in (SteamUser, GameProposal, Purchase):
+            table = model.__table__
+            conn.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table.fullname}', 'id'), "
+                f"(SELECT MAX(id) FROM {table.fullname}))"
+            ))
+        conn.execute(text("ANALYZE"))
+
+    print(f"balance: {asyncio.run(_rebuild())} filas")
+
+
+if __name__ == "__main__":
+    main()
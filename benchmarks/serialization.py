@@ -0,0 +1,94 @@
+"""
+Microbenchmark de serialización de listados, sin base de datos.
+
+Ejecutar: python -m benchmarks.serialization --rows 200 1000 5000
+
+Compara, para el mismo contenido:
+- camino anterior: objetos ORM -> validación contra response_model -> jsonable_encoder/json.dumps
+  (lo que hace FastAPI cuando el endpoint devuelve objetos)
+- camino rápido: dicts de columnas -> TypeAdapter precompilado -> bytes (app.utils.responses)
+y verifica que ambos producen exactamente el mismo JSON.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import TypeAdapter
+
+from app.models import Deposit
+from app.schemas import schemas
+from app.utils.responses import json_response, model_response
+
+DEPOSIT_PAGE = TypeAdapter(schemas.Page[schemas.Deposit])
+
+
+def deposit_rows(count: int):
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [{
+        "id": i,
+        "member_id": i % 20 + 1,
+        "amount": 10000 + i,
+        "note": f"depósito {i}",
+        "date": start + timedelta(minutes=i),
+        "created_at": start + timedelta(minutes=i)
+    } for i in range(count)]
+
+
+async def legacy_page(rows):
+    field = create_response_field(name="response", type_=schemas.Page[schemas.Deposit])
+    content = {"items": [Deposit(**row) for row in rows], "next_cursor": None}
+    encoded = await serialize_response(field=field, response_content=content, is_coroutine=True)
+    return JSONResponse(encoded).body
+
+
+def fast_page(rows):
+    return model_response(DEPOSIT_PAGE, {"items": [dict(row) for row in rows], "next_cursor": None}).body
+
+
+async def legacy_dicts(rows):
+    # Como /auth/users antes: response_model=list
+    field = create_response_field(name="response", type_=list)
+    encoded = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+    return JSONResponse(encoded).body
+
+
+def fast_dicts(rows):
+    return json_response(rows).body
+
+
+def measure(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    print(f"{'caso':28} {'filas':>6} {'anterior':>12} {'rápido':>12} {'mejora':>8}")
+    for count in args.rows:
+        rows = deposit_rows(count)
+        cases = {
+            "Page[Deposit] (modelo)": (lambda: loop.run_until_complete(legacy_page(rows)), lambda: fast_page(rows)),
+            "lista de dicts": (lambda: loop.run_until_complete(legacy_dicts(rows)), lambda: fast_dicts(rows)),
+        }
+        for name, (legacy, fast) in cases.items():
+            assert legacy() == fast(), "los dos caminos deben producir el mismo JSON"
+            before, after = measure(legacy, args.repeat), measure(fast, args.repeat)
+            print(f"{name:28} {count:>6} {count / before:>9.0f}/s {count / after:>9.0f}/s {before / after:>7.1f}x")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,12 @@
 #!/usr/bin/env bash
 # Build script para Render
+set -o errexit
 
 # Actualizar pip
 pip install --upgrade pip
 
 # Instalar dependencias
 pip install -r requirements.txt
+
+# Migraciones: el código nuevo necesita el esquema al día desde la primera petición
+alembic upgrade head
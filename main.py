@@ -1,14 +1,47 @@
+import logging
 import os
-from fastapi import FastAPI, Depends, HTTPException
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pathlib import Path
 
-from app.database import get_db
-from app.routers import auth_router, deposits_router, proposals_router, purchases_router
+from app.database import get_db, async_engine
+from app.routers import auth_router, deposits_router, proposals_router, purchases_router, export_router, collections_router, adjustments_router, settings_router
+from app.utils.audit import audit_log
+from app.utils.auth import get_current_active_user, get_current_user, get_token_from_cookie_or_header, require_master_role, security
+from app.utils.external import shutdown_external_executor
+from app.utils.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.utils.settings import app_settings
+
+logger = logging.getLogger(__name__)
+
+# /metrics exige una sesión de master o "Authorization: Bearer <METRICS_TOKEN>" (para el
+# scraper); con METRICS_PUBLIC=1 queda abierto, p. ej. detrás de una red privada
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "False").lower() in ("1", "true")
+
+instrument_engine(async_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    try:
+        await app_settings.load()
+    except Exception:
+        # Sin base al arrancar se sirven los valores por defecto hasta un POST /settings/reload
+        logger.exception("No se pudo cargar la configuración, se usan los valores por defecto")
+    audit_log.start()
+    yield
+    await audit_log.stop()
+    shutdown_external_executor()
+    await async_engine.dispose()
 
 app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     title="API Steam Group Management",
     description="API REST para gestión de grupo Steam con FastAPI y PostgreSQL",
     version="1.0.0",
@@ -28,6 +61,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
 
 uploads_dir = Path("uploads")
 uploads_dir.mkdir(exist_ok=True)
@@ -37,6 +71,10 @@ app.include_router(auth_router)
 app.include_router(deposits_router)
 app.include_router(proposals_router)
 app.include_router(purchases_router)
+app.include_router(export_router)
+app.include_router(collections_router)
+app.include_router(adjustments_router)
+app.include_router(settings_router)
 
 @app.get("/")
 async def root():
@@ -50,13 +88,27 @@ async def root():
     }
 
 @app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
+async def health_check(db: AsyncSession = Depends(get_db)):
     try:
         from sqlalchemy import text
-        db.execute(text("SELECT 1"))
+        await db.execute(text("SELECT 1"))
         return {
             "status": "healthy",
             "database": "connected"
         }
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Database connection failed: {str(e)}")
+
+async def authorize_metrics(request: Request):
+    if METRICS_PUBLIC:
+        return
+    authorization = request.headers.get("authorization", "")
+    if METRICS_TOKEN and secrets.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        return
+    # Sin el token de métricas: sesión de master, igual que los endpoints de administración
+    token = await get_token_from_cookie_or_header(request, await security(request))
+    await require_master_role(await get_current_active_user(await get_current_user(token)))
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(authorize_metrics)])
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,49 @@
+"""Índices para las consultas de los routers
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, opciones)
+INDEXES = [
+    ('ix_steamuser_auth_uid', 'steamuser', ['auth_uid'], {}),
+    ('ix_deposits_member_id_date', 'deposits', ['member_id', 'date', 'id'], {}),
+    ('ix_deposits_date_id', 'deposits', ['date', 'id'], {}),
+    ('ix_purchase_shares_member_id_paid', 'purchase_shares', ['member_id', 'paid'],
+     {'postgresql_include': ['share_amount', 'purchase_id']}),
+    ('ix_votes_member_id', 'votes', ['member_id'], {}),
+    ('ix_game_proposals_proposed', 'game_proposals', ['id'],
+     {'postgresql_where': sa.text("status = 'proposed'")}),
+    ('ix_game_proposals_active_proposer', 'game_proposals', ['proposer_id'],
+     {'postgresql_where': sa.text("status IN ('proposed', 'voted')")}),
+    ('ix_game_proposals_month_year', 'game_proposals', ['month_year', 'proposal_number'], {}),
+    ('ix_game_proposals_proposed_at_id', 'game_proposals', ['proposed_at', 'id'], {}),
+    ('ix_purchases_purchased_at_id', 'purchases', ['purchased_at', 'id'], {}),
+]
+
+
+def upgrade():
+    # CONCURRENTLY no bloquea escrituras mientras se construye el índice, pero no puede
+    # ejecutarse dentro de una transacción
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            op.create_index(
+                name, table, columns, schema='public',
+                postgresql_concurrently=True, if_not_exists=True, **options
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, schema='public', postgresql_concurrently=True, if_exists=True)
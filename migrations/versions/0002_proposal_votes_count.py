@@ -0,0 +1,34 @@
+"""Contador de votos en game_proposals
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Con server_default constante Postgres agrega la columna sin reescribir la tabla
+    op.add_column(
+        'game_proposals',
+        sa.Column('votes_count', sa.Integer(), nullable=False, server_default='0'),
+        schema='public'
+    )
+    op.execute("""
+        UPDATE public.game_proposals AS p
+        SET votes_count = v.votes
+        FROM (SELECT proposal_id, count(*) AS votes FROM public.votes GROUP BY proposal_id) AS v
+        WHERE v.proposal_id = p.id
+    """)
+
+
+def downgrade():
+    op.drop_column('game_proposals', 'votes_count', schema='public')
@@ -0,0 +1,66 @@
+"""Voto activo único por miembro
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'votes',
+        sa.Column('active', sa.Boolean(), nullable=False, server_default=sa.text('true')),
+        schema='public'
+    )
+    # Activos son los votos de propuestas todavía en votación
+    op.execute("""
+        UPDATE public.votes AS v
+        SET active = false
+        FROM public.game_proposals AS p
+        WHERE p.id = v.proposal_id AND p.status <> 'proposed'
+    """)
+    # Si quedó más de un voto activo por miembro se conserva el más reciente
+    op.execute("""
+        UPDATE public.votes AS v
+        SET active = false
+        WHERE v.active AND EXISTS (
+            SELECT 1 FROM public.votes AS newer
+            WHERE newer.member_id = v.member_id AND newer.active AND newer.id > v.id
+        )
+    """)
+    # Los votos descartados de propuestas aún en votación se borran: la restricción
+    # (proposal_id, member_id) haría fallar un nuevo voto del miembro en esa propuesta, y
+    # en una ronda abierta el contador solo debe incluir votos activos
+    op.execute("""
+        DELETE FROM public.votes AS v
+        USING public.game_proposals AS p
+        WHERE p.id = v.proposal_id AND p.status = 'proposed' AND NOT v.active
+    """)
+    op.execute("""
+        UPDATE public.game_proposals AS p
+        SET votes_count = (SELECT count(*) FROM public.votes AS v WHERE v.proposal_id = p.id)
+        WHERE p.status = 'proposed'
+    """)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_votes_active_member', 'votes', ['member_id'], unique=True, schema='public',
+            postgresql_where=sa.text('active'), postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'uq_votes_active_member', table_name='votes', schema='public',
+            postgresql_concurrently=True, if_exists=True
+        )
+    op.drop_column('votes', 'active', schema='public')
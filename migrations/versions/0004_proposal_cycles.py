@@ -0,0 +1,39 @@
+"""Tabla de ciclos de propuestas por mes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'proposal_cycles',
+        sa.Column('month_year', sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column('proposal_number', sa.Integer(), nullable=False, unique=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        schema='public'
+    )
+    # Los meses ya numerados conservan su número; ante duplicados gana el mes más antiguo
+    op.execute("""
+        INSERT INTO public.proposal_cycles (month_year, proposal_number)
+        SELECT month_year, min(proposal_number)
+        FROM public.game_proposals
+        WHERE month_year IS NOT NULL AND proposal_number IS NOT NULL
+        GROUP BY month_year
+        ORDER BY month_year
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade():
+    op.drop_table('proposal_cycles', schema='public')
@@ -0,0 +1,52 @@
+"""Ajustes incluidos en el saldo materializado
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_adjustments_member_id_created_at', 'adjustments', ['member_id', 'created_at', 'id']),
+    ('ix_adjustments_created_at_id', 'adjustments', ['created_at', 'id']),
+]
+
+
+def upgrade():
+    op.add_column(
+        'balance',
+        sa.Column('total_adjustments', sa.Integer(), nullable=False, server_default='0'),
+        schema='public'
+    )
+    # Los ajustes existentes nunca se habían sumado al saldo; solo se corrigen filas que ya
+    # existen (la 0006 recalcula la tabla completa desde el historial)
+    op.execute("""
+        UPDATE public.balance SET
+            total_adjustments = a.amount,
+            current_balance = balance.total_deposits - balance.total_expenses + a.amount,
+            last_updated = now()
+        FROM (SELECT member_id, sum(amount) AS amount FROM public.adjustments GROUP BY member_id) a
+        WHERE a.member_id = balance.member_id
+    """)
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, schema='public',
+                postgresql_concurrently=True, if_not_exists=True
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, schema='public', postgresql_concurrently=True, if_exists=True)
+    op.execute("UPDATE public.balance SET current_balance = current_balance - total_adjustments")
+    op.drop_column('balance', 'total_adjustments', schema='public')
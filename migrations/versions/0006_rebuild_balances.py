@@ -0,0 +1,49 @@
+"""Recalcula el saldo materializado desde el historial
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+"""
+from alembic import op
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Mismo cálculo que app.utils.balances.rebuild_balances: tras el upgrade `balance` queda
+    # consistente con depósitos, participaciones pagadas y ajustes, sin pasos manuales
+    op.execute("""
+        INSERT INTO public.balance (member_id, total_deposits, total_expenses, total_adjustments, current_balance, last_updated)
+        SELECT
+            u.id,
+            coalesce(d.amount, 0),
+            coalesce(s.amount, 0),
+            coalesce(a.amount, 0),
+            coalesce(d.amount, 0) - coalesce(s.amount, 0) + coalesce(a.amount, 0),
+            now()
+        FROM public.steamuser u
+        LEFT JOIN (SELECT member_id, sum(amount) AS amount FROM public.deposits GROUP BY member_id) d
+            ON d.member_id = u.id
+        LEFT JOIN (
+            SELECT member_id, sum(share_amount) AS amount FROM public.purchase_shares
+            WHERE paid GROUP BY member_id
+        ) s ON s.member_id = u.id
+        LEFT JOIN (SELECT member_id, sum(amount) AS amount FROM public.adjustments GROUP BY member_id) a
+            ON a.member_id = u.id
+        ON CONFLICT (member_id) DO UPDATE SET
+            total_deposits = excluded.total_deposits,
+            total_expenses = excluded.total_expenses,
+            total_adjustments = excluded.total_adjustments,
+            current_balance = excluded.current_balance,
+            last_updated = excluded.last_updated
+    """)
+
+
+def downgrade():
+    # Solo datos: los saldos recalculados siguen siendo válidos en el esquema anterior
+    pass
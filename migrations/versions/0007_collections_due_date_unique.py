@@ -0,0 +1,44 @@
+"""Vencimiento único por cobro mensual
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Los cobros repetidos pueden tener pagos registrados: no se borran acá, se informan
+    # (con --sql no hay conexión y el CREATE INDEX fallaría solo)
+    if not context.is_offline_mode():
+        duplicates = op.get_bind().execute(sa.text("""
+            SELECT due_date, string_agg(id::text, ', ' ORDER BY id)
+            FROM public.monthly_collections
+            GROUP BY due_date
+            HAVING count(*) > 1
+            ORDER BY due_date
+        """)).all()
+        if duplicates:
+            listed = "; ".join(f"{due_date}: {ids}" for due_date, ids in duplicates)
+            raise RuntimeError(f"Hay cobros con el mismo vencimiento, unificarlos antes de migrar ({listed})")
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_monthly_collections_due_date', 'monthly_collections', ['due_date'], unique=True,
+            schema='public', postgresql_concurrently=True, if_not_exists=True
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'uq_monthly_collections_due_date', table_name='monthly_collections', schema='public',
+            postgresql_concurrently=True, if_exists=True
+        )
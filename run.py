@@ -1,10 +1,59 @@
 """
 Script para ejecutar el servidor de desarrollo.
 Ejecutar: python run.py
+
+Perfil de arranque (qué módulos tardan más en importarse):
+    python run.py --profile-startup [--top 25]
 """
-import uvicorn
+import argparse
+import subprocess
+import sys
+import time
+
+
+def profile_startup(top: int):
+    """Importa la app en un proceso limpio con `-X importtime` y muestra los módulos más lentos."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+
+    # Formato de cada línea: "import time: <self us> | <acumulado us> | <módulo indentado>"
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        entries.append((int(self_us), int(cumulative_us), module.strip()))
+
+    total_us = next((cumulative for _, cumulative, module in entries if module == "main"), 0)
+    print(f"Proceso completo: {wall * 1000:.0f} ms | import main: {total_us / 1000:.0f} ms | {len(entries)} módulos\n")
+
+    for title, key in (("Acumulado (módulo + dependencias)", 1), ("Propio (solo el módulo)", 0)):
+        print(title)
+        for entry in sorted(entries, key=lambda entry: entry[key], reverse=True)[:top]:
+            print(f"  {entry[key] / 1000:8.1f} ms  {entry[2]}")
+        print()
+    return 0
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor de desarrollo")
+    parser.add_argument("--profile-startup", action="store_true", help="medir el tiempo de import de la app y salir")
+    parser.add_argument("--top", type=int, default=20, help="módulos a listar con --profile-startup")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        sys.exit(profile_startup(args.top))
+
+    import uvicorn
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
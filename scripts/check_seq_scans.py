@@ -0,0 +1,93 @@
+"""
+Revisa los planes de las consultas calientes de los routers y reporta cuáles siguen
+haciendo Seq Scan.
+
+Ejecutar: python scripts/check_seq_scans.py [--allow-seqscan]
+
+Por defecto se desactiva `enable_seqscan`, así un Seq Scan en el plan significa que no hay
+índice utilizable para esa consulta (con pocas filas Postgres prefiere el Seq Scan aunque
+el índice exista). Con --allow-seqscan se muestran los planes reales con los datos actuales.
+Sale con código 1 si alguna consulta tiene Seq Scan.
+"""
+import argparse
+import json
+import sys
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import select  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.models import SteamUser, Deposit, GameProposal, Vote, Purchase, PurchaseShare  # noqa: E402
+from app.models.models import Adjustment  # noqa: E402
+
+PAGE = 51
+
+# Réplicas de las consultas de los routers, con valores de ejemplo
+QUERIES = {
+    "auth: usuario por auth_uid": select(SteamUser).where(SteamUser.auth_uid == uuid.UUID(int=1)),
+    "deposits: página general": select(Deposit).order_by(Deposit.date.desc(), Deposit.id.desc()).limit(PAGE),
+    "deposits: página por miembro": select(Deposit).where(Deposit.member_id == 1)
+        .order_by(Deposit.date.desc(), Deposit.id.desc()).limit(PAGE),
+    "adjustments: página general": select(Adjustment)
+        .order_by(Adjustment.created_at.desc(), Adjustment.id.desc()).limit(PAGE),
+    "adjustments: página por miembro": select(Adjustment).where(Adjustment.member_id == 1)
+        .order_by(Adjustment.created_at.desc(), Adjustment.id.desc()).limit(PAGE),
+    "purchases: página general": select(Purchase)
+        .order_by(Purchase.purchased_at.desc(), Purchase.id.desc()).limit(PAGE),
+    "purchases: participaciones pendientes": select(PurchaseShare, Purchase)
+        .join(Purchase, PurchaseShare.purchase_id == Purchase.id)
+        .where(PurchaseShare.member_id == 1, PurchaseShare.paid == False),
+    "purchases: participaciones de una compra": select(PurchaseShare).where(PurchaseShare.purchase_id == 1),
+    "proposals: página general": select(GameProposal)
+        .order_by(GameProposal.proposed_at.desc(), GameProposal.id.desc()).limit(PAGE),
+    "proposals: propuesta activa del miembro": select(GameProposal).where(
+        GameProposal.proposer_id == 1, GameProposal.status.in_(['proposed', 'voted'])
+    ),
+    "proposals: propuestas del mes": select(GameProposal).where(GameProposal.month_year == 202601),
+    "proposals: propuestas en votación": select(GameProposal).where(GameProposal.status == 'proposed'),
+    "votes: voto actual del miembro": select(Vote).join(GameProposal, Vote.proposal_id == GameProposal.id)
+        .where(Vote.member_id == 1, Vote.active),
+    "votes: votos de una propuesta": select(Vote).where(Vote.proposal_id == 1),
+}
+
+
+def seq_scans(plan: dict):
+    """Devuelve las tablas que aparecen con Seq Scan en un nodo del plan y sus hijos."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--allow-seqscan", action="store_true", help="no desactivar enable_seqscan")
+    args = parser.parse_args()
+
+    failures = 0
+    with engine.connect() as conn:
+        if not args.allow_seqscan:
+            conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, stmt in QUERIES.items():
+            compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+            result = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}").scalar()
+            plan = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+            tables = seq_scans(plan)
+            if tables:
+                failures += 1
+                print(f"SEQ SCAN  {name}: {', '.join(tables)}")
+            else:
+                print(f"ok        {name}")
+        conn.rollback()
+
+    print(f"\n{failures} de {len(QUERIES)} consultas con Seq Scan")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
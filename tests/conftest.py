@@ -0,0 +1,41 @@
+import pytest
+
+
+class FakeSession:
+    """Sesión async mínima para probar helpers sin base de datos.
+
+    Registra cada llamada a execute/scalar como (sentencia, parámetros) y cuenta commits y
+    rollbacks; `scalar` devuelve `scalar_result` y `execute`, `execute_result`.
+    """
+
+    def __init__(self, scalar_result=None, execute_result=None):
+        self.scalar_result = scalar_result
+        self.execute_result = execute_result
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        return self.execute_result
+
+    async def scalar(self, statement, params=None):
+        self.executed.append((statement, params))
+        return self.scalar_result
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def fake_session():
+    return FakeSession()
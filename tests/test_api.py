@@ -4,6 +4,13 @@ from main import app
 
 client = TestClient(app)
 
+# El motor asíncrono guarda conexiones ligadas a un event loop: todas las peticiones
+# del módulo deben correr dentro del mismo contexto del cliente
+@pytest.fixture(scope="module", autouse=True)
+def client_lifespan():
+    with client:
+        yield
+
 # Ejemplo: test de registro
 # Puedes agregar credenciales de prueba y datos válidos para cada endpoint
 
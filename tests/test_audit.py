@@ -0,0 +1,28 @@
+import asyncio
+
+from app.utils.audit import AuditWriter
+
+
+def test_full_queue_drops_instead_of_blocking(fake_session):
+    writer = AuditWriter(queue_size=2, session_factory=lambda: fake_session)
+    for number in range(3):
+        writer.record("deposit.create", 1, {"n": number})
+    assert writer.pending == 2
+    assert writer.stats["dropped"] == 1
+
+
+def test_stop_flushes_pending_events_in_batches(fake_session):
+    async def scenario():
+        writer = AuditWriter(queue_size=100, batch_size=10, flush_seconds=60, session_factory=lambda: fake_session)
+        writer.start()
+        for number in range(25):
+            writer.record("vote.cast", 2, {"proposal_id": number})
+        await writer.stop()
+        batches = [rows for _, rows in fake_session.executed]
+        assert [len(rows) for rows in batches] == [10, 10, 5]
+        assert [row["payload"]["proposal_id"] for rows in batches for row in rows] == list(range(25))
+        assert fake_session.commits == 3
+        assert writer.stats["written"] == 25
+        assert writer.pending == 0
+
+    asyncio.run(scenario())
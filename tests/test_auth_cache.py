@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import SteamUser
+from app.utils import auth, cache
+from app.utils.cache import TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    # Solo el reloj de la caché: asyncio sigue usando el time.monotonic real
+    monkeypatch.setattr(cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("a", 1)
+    clock.now += 29.9
+    assert ttl_cache.get("a") == 1
+    clock.now += 0.1
+    assert ttl_cache.get("a") is None
+    assert len(ttl_cache) == 0
+
+
+def test_entry_ttl_is_capped_by_cache_ttl(clock):
+    ttl_cache = TTLCache(maxsize=10, ttl=30)
+    ttl_cache.set("long", 1, ttl=3600)
+    ttl_cache.set("short", 2, ttl=5)
+    ttl_cache.set("expired", 3, ttl=0)
+    assert ttl_cache.get("expired") is None
+    clock.now += 5
+    assert ttl_cache.get("short") is None
+    assert ttl_cache.get("long") == 1
+    clock.now += 25
+    assert ttl_cache.get("long") is None
+
+
+def test_least_recently_used_is_evicted_at_capacity(clock):
+    ttl_cache = TTLCache(maxsize=2, ttl=30)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+    assert len(ttl_cache) == 2
+    assert ttl_cache.get("b") is None
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (1, 3)
+
+
+AUTH_UID = uuid.UUID(int=7)
+
+
+def member(**changes):
+    values = dict(
+        id=7, name="Ana", role="member", active=True, auth_uid=AUTH_UID, profile_image=None,
+        created_at=datetime(2026, 1, 1), updated_at=datetime(2026, 1, 1)
+    )
+    values.update(changes)
+    return SteamUser(**values)
+
+
+@pytest.fixture
+def db_user(monkeypatch, fake_session, clock):
+    """La "base" de get_current_user: cambiar fake_session.scalar_result cambia el usuario."""
+    monkeypatch.setattr(auth, "AsyncSessionLocal", lambda: fake_session)
+    auth.invalidate_user_cache()
+    fake_session.scalar_result = member()
+    yield fake_session
+    auth.invalidate_user_cache()
+
+
+def current_user():
+    token = auth.create_access_token({"sub": str(AUTH_UID)})
+    return asyncio.run(auth.get_current_user(token))
+
+
+def test_cached_user_is_reloaded_after_invalidation(db_user):
+    assert current_user().role == "member"
+    db_user.scalar_result = member(role="master")
+    # Sin invalidar se sigue sirviendo la copia cacheada, sin consultar la base
+    assert current_user().role == "member"
+    assert len(db_user.executed) == 1
+
+    auth.invalidate_user_cache(AUTH_UID)
+    assert current_user().role == "master"
+    assert len(db_user.executed) == 2
+
+
+def test_deactivated_user_is_rejected_after_invalidation(db_user):
+    assert current_user().active
+    db_user.scalar_result = member(active=False)
+    auth.invalidate_user_cache()
+    with pytest.raises(HTTPException) as error:
+        current_user()
+    assert error.value.status_code == 403
+
+
+def test_cached_user_expires_after_ttl(db_user, clock):
+    current_user()
+    db_user.scalar_result = member(role="master")
+    clock.now += auth.AUTH_CACHE_TTL_SECONDS
+    assert current_user().role == "master"
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import DBAPIError
+
+from app.database import run_with_retry
+
+
+class PgError(Exception):
+    def __init__(self, sqlstate):
+        super().__init__(sqlstate)
+        self.sqlstate = sqlstate
+
+
+def pg_error(sqlstate):
+    return DBAPIError("INSERT INTO purchases ...", {}, PgError(sqlstate))
+
+
+def test_deadlock_retries_and_commits_purchase_once(fake_session):
+    attempts = []
+
+    async def purchase():
+        attempts.append(len(attempts) + 1)
+        await fake_session.execute("INSERT INTO purchases ...")
+        if len(attempts) == 1:
+            raise pg_error("40P01")
+        await fake_session.commit()
+        return "purchase"
+
+    assert asyncio.run(run_with_retry(fake_session, purchase)) == "purchase"
+    assert attempts == [1, 2]
+    assert fake_session.rollbacks == 1
+    assert fake_session.commits == 1
+
+
+def test_serialization_failure_at_commit_is_retried(fake_session):
+    commits = []
+
+    async def failing_commit():
+        commits.append(1)
+        if len(commits) == 1:
+            raise pg_error("40001")
+        fake_session.commits += 1
+
+    fake_session.commit = failing_commit
+
+    async def purchase():
+        await fake_session.commit()
+
+    asyncio.run(run_with_retry(fake_session, purchase))
+    assert fake_session.commits == 1
+    assert fake_session.rollbacks == 1
+
+
+def test_other_database_errors_are_not_retried(fake_session):
+    attempts = []
+
+    async def purchase():
+        attempts.append(1)
+        raise pg_error("23505")
+
+    with pytest.raises(DBAPIError):
+        asyncio.run(run_with_retry(fake_session, purchase))
+    assert len(attempts) == 1
+    assert fake_session.commits == 0
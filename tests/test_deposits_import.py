@@ -0,0 +1,24 @@
+import pytest
+
+from app.utils.deposits import read_deposit_csv, validate_deposit_rows
+
+def test_csv_semicolon_blank_cells_and_date_only():
+    rows = read_deposit_csv("\ufeffmember_id;amount;note;date;banco\n4;2500;transferencia;;BCI\n5;3000;;2026-02-01\n".encode())
+    assert rows == [
+        {"member_id": "4", "amount": "2500", "note": "transferencia"},
+        {"member_id": "5", "amount": "3000", "date": "2026-02-01T00:00:00"},
+    ]
+
+def test_csv_requires_member_and_amount_columns():
+    with pytest.raises(ValueError):
+        read_deposit_csv(b"miembro,monto\n1,100\n")
+
+def test_validation_reports_every_bad_row():
+    deposits, errors = validate_deposit_rows([
+        {"member_id": 1, "amount": 100},
+        {"member_id": 2, "amount": 0},
+        {"amount": 5},
+    ])
+    assert [number for number, _ in deposits] == [1]
+    assert [error["row"] for error in errors] == [2, 3]
+    assert errors[1]["error"].startswith("member_id")
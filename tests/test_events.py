@@ -0,0 +1,57 @@
+import asyncio
+
+from app.utils.events import Broadcaster
+
+
+def drain(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get_nowait())
+    return events
+
+
+def test_publish_fans_out_to_all_subscribers():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=10)
+        first, second = broadcaster.subscribe(), broadcaster.subscribe()
+        broadcaster.publish("vote", {"proposal_id": 1})
+        assert [e.name for e in drain(first)] == ["vote"]
+        assert [e.name for e in drain(second)] == ["vote"]
+        broadcaster.unsubscribe(first)
+        broadcaster.publish("vote_removed", {"proposal_id": 1})
+        assert drain(first) == []
+        assert broadcaster.subscribers == 1
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_gets_resync_instead_of_blocking():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=2)
+        queue = broadcaster.subscribe()
+        for i in range(3):
+            broadcaster.publish("vote", {"i": i})
+        assert [e.name for e in drain(queue)] == ["resync"]
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_replays_missed_events():
+    async def scenario():
+        broadcaster = Broadcaster(queue_size=10)
+        for i in range(3):
+            broadcaster.publish("vote", {"i": i})
+        assert [e.id for e in drain(broadcaster.subscribe(last_event_id=1))] == [2, 3]
+        assert [e.name for e in drain(broadcaster.subscribe(last_event_id=50))] == ["resync"]
+
+    asyncio.run(scenario())
+
+
+def test_can_resume_only_with_the_whole_gap_buffered():
+    broadcaster = Broadcaster(queue_size=10, replay_size=2)
+    for i in range(3):
+        broadcaster.publish("vote", {"i": i})
+    assert broadcaster.can_resume(3)
+    assert broadcaster.can_resume(1)
+    assert not broadcaster.can_resume(0)
+    assert not broadcaster.can_resume(50)
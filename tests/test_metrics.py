@@ -0,0 +1,24 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils.metrics import MetricsMiddleware, render_metrics
+
+
+def test_requests_are_labelled_with_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/widgets/{widget_id}")
+    async def get_widget(widget_id: int):
+        return {"id": widget_id}
+
+    client = TestClient(app)
+    for widget_id in (1, 2, 3):
+        client.get(f"/widgets/{widget_id}")
+    client.get("/missing")
+
+    text = render_metrics()
+    assert 'http_requests_total{method="GET",route="/widgets/{widget_id}",status="200"} 3' in text
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/widgets/{widget_id}",le="+Inf"} 3' in text
+    assert "/widgets/1" not in text
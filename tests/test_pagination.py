@@ -0,0 +1,78 @@
+import asyncio
+import base64
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models import Deposit
+from app.utils.pagination import decode_cursor, encode_cursor, fetch_page
+
+
+class FakeResult:
+    """Resultado con las filas que devolvería la base para la consulta paginada."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self.rows
+
+
+def deposit_rows(count):
+    return [{"date": datetime(2026, 1, 1, 12, 0, count - i), "id": count - i} for i in range(count)]
+
+
+def compiled(statement):
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def page(db, rows, cursor=None, limit=3):
+    db.execute_result = FakeResult(rows)
+    stmt = select(Deposit.date, Deposit.id)
+    result = asyncio.run(fetch_page(db, stmt, Deposit.date, Deposit.id, cursor, limit, mappings=True))
+    return result, compiled(db.executed[-1][0])
+
+
+def test_cursor_roundtrip():
+    value = datetime(2026, 3, 4, 5, 6, 7, 890)
+    cursor = encode_cursor(value, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (value, 42)
+
+
+@pytest.mark.parametrize("cursor", [
+    "no es base64!",
+    base64.urlsafe_b64encode(b"no es json").decode(),
+    base64.urlsafe_b64encode(b'["2026-01-01T00:00:00"]').decode(),
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    base64.urlsafe_b64encode(b'["ayer", 2]').decode(),
+    base64.urlsafe_b64encode(b'["2026-01-01T00:00:00", "x"]').decode(),
+])
+def test_malformed_or_tampered_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+def test_full_page_has_next_cursor_from_last_item(fake_session):
+    # La consulta pide limit + 1 filas: la extra solo indica que hay otra página
+    result, sql = page(fake_session, deposit_rows(4))
+    assert "LIMIT 4" in sql
+    assert "ORDER BY public.deposits.date DESC, public.deposits.id DESC" in sql
+    assert [row["id"] for row in result["items"]] == [4, 3, 2]
+    assert decode_cursor(result["next_cursor"]) == (datetime(2026, 1, 1, 12, 0, 2), 2)
+
+
+def test_last_page_has_no_next_cursor(fake_session):
+    result, _ = page(fake_session, deposit_rows(3))
+    assert len(result["items"]) == 3
+    assert result["next_cursor"] is None
+    assert page(fake_session, [])[0] == {"items": [], "next_cursor": None}
+
+
+def test_cursor_filters_after_previous_page(fake_session):
+    _, sql = page(fake_session, deposit_rows(1), cursor=encode_cursor(datetime(2026, 1, 1, 12), 7))
+    assert "(public.deposits.date, public.deposits.id) < ('2026-01-01 12:00:00', 7)" in sql
@@ -0,0 +1,17 @@
+from app.utils.settings import parse_settings
+
+
+def test_missing_keys_use_defaults():
+    settings = parse_settings([("amount_per_member", 12000)])
+    assert settings.amount_per_member == 12000
+    assert settings.owner_share_ratio == 0.4
+
+
+def test_invalid_and_unknown_keys_are_ignored():
+    settings = parse_settings([
+        ("owner_share_ratio", 1.5),
+        ("min_active_members", "6"),
+        ("theme", "dark"),
+    ])
+    assert settings.owner_share_ratio == 0.4
+    assert settings.min_active_members == 6
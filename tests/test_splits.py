@@ -0,0 +1,54 @@
+from fractions import Fraction
+
+import pytest
+
+from app.utils.splits import compute_split, compute_splits
+
+# Regla clásica: 6 usuarios, propietario 40% y 5 participantes
+def test_split_classic_six_members():
+    split = compute_split(100000, 5)
+    assert split.owner_share == 40000
+    assert split.participant_share == 12000
+    assert split.owner_percent == "40"
+    assert split.participant_percent == "12"
+
+def test_split_remainder_goes_to_owner():
+    split = compute_split(10001, 5)
+    assert split.participant_share == 1200
+    assert split.owner_share == 4001
+    assert split.owner_share + split.participants_total == 10001
+    # floor(10004 * 0.4) = 4001; los 6003 restantes dan 1200 a cada uno y 3 de resto
+    split = compute_split(10004, 5)
+    assert split.participant_share == 1200
+    assert split.owner_share == 4004
+
+# Regla anterior con float: int(total * 0.40) al propietario, int(resto / 5) a cada participante
+# y lo que sobre también al propietario
+def legacy_six_member_split(total):
+    owner = int(total * 0.40)
+    participant = int((total - owner) / 5)
+    return owner + (total - owner - participant * 5), participant
+
+def test_split_six_members_matches_legacy_rule():
+    for total in list(range(1, 20001)) + [99999, 123457, 1000003]:
+        split = compute_split(total, 5)
+        assert (split.owner_share, split.participant_share) == legacy_six_member_split(total)
+
+def test_split_any_group_size_and_ratio():
+    split = compute_split(99999, 7, owner_ratio="0.25")
+    assert split.owner_ratio == Fraction(1, 4)
+    assert split.owner_share + split.participants_total == 99999
+    assert split.participant_share == (99999 - 99999 // 4) // 7
+
+def test_split_float_ratio_is_exact():
+    assert compute_split(100, 5, owner_ratio=0.4).owner_ratio == Fraction(2, 5)
+
+def test_batch_matches_single_splits():
+    totals = [1, 999, 35000, 123457]
+    counts = [5, 6, 9, 3]
+    batch = compute_splits(totals, counts)
+    assert batch == [compute_split(t, n) for t, n in zip(totals, counts)]
+
+def test_split_invalid_ratio():
+    with pytest.raises(ValueError):
+        compute_split(1000, 5, owner_ratio=Fraction(3, 2))
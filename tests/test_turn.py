@@ -0,0 +1,13 @@
+import asyncio
+
+from app.utils.turn import TurnState
+
+
+def test_status_is_read_from_database_once(fake_session):
+    async def scenario():
+        fake_session.scalar_result = True
+        turn = TurnState(session_factory=lambda: fake_session)
+        assert [await turn.get() for _ in range(3)] == [True, True, True]
+        assert len(fake_session.executed) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import versions
+
+app = FastAPI()
+
+
+@app.get("/items")
+async def items(etag: None = Depends(versions.conditional("purchases"))):
+    return {"ok": True}
+
+
+client = TestClient(app)
+
+
+def test_etag_roundtrip_returns_304_until_bump():
+    first = client.get("/items")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = client.get("/items", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    versions.bump("purchases")
+    changed = client.get("/items", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+def test_etag_depends_on_query_string():
+    etag = client.get("/items?limit=10").headers["etag"]
+    assert client.get("/items?limit=20", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_other_resources_do_not_invalidate():
+    etag = client.get("/items").headers["etag"]
+    versions.bump("deposits", "balances")
+    assert client.get("/items", headers={"If-None-Match": etag}).status_code == 304
+
+
+def test_if_modified_since():
+    last_modified = client.get("/items").headers["last-modified"]
+    assert client.get("/items", headers={"If-Modified-Since": last_modified}).status_code == 304
+    assert client.get("/items", headers={"If-Modified-Since": "Thu, 01 Jan 2015 00:00:00 GMT"}).status_code == 200
+
+
+def test_if_modified_since_same_second_is_not_cached():
+    last_modified = client.get("/items").headers["last-modified"]
+    # Dos cambios seguidos caen en el mismo segundo de reloj; cada uno avanza Last-Modified
+    versions.bump("purchases")
+    changed = client.get("/items", headers={"If-Modified-Since": last_modified})
+    assert changed.status_code == 200
+    versions.bump("purchases")
+    assert client.get("/items", headers={"If-Modified-Since": changed.headers["last-modified"]}).status_code == 200